@@ -1,26 +1,83 @@
-from flask import Flask, request, jsonify
-from orchestration import run_agent
-from werkzeug.utils import secure_filename
-import tempfile
+from tools.startup import timed, startup_report
+with timed("import:flask"):
+    from flask import Flask, Request, request, jsonify, Response, stream_with_context, send_file
+with timed("import:orchestration"):
+    from orchestration import run_agent, smart_rewrite, get_user_text, SESSIONS, warm_up, dialogue_stats
+from tools.rewrite_engine import rewrite_stats
+from tools.rewrite_cache import rewrite_cache_stats
+from tools.rewrite_policy import rewrite_policy_stats
+from tools.outbox import delivery_status
+from tools.session_lock import session_lock_stats
+from tools.detect_intent_tool import intent_cache_stats
+from tools.speech_to_text import stt_stats, AudioTooLong, STT_MAX_SECONDS
+from tools.text_to_speech import tts_stats, ensure_audio
+from tools.stt_pool import SttBusy, stt_pool_stats
+from tools.generate_qr_code import get_qr_png
+from tools.static_assets import find_by_public_path, asset_stats
+from tools.tracing import start_trace, new_trace_id, recent_traces, get_trace, trace_stats
+from tools.media_files import (
+    resolve_media, file_etag, content_etag, is_immutable, MEDIA_MAX_AGE, IMMUTABLE_MAX_AGE,
+)
+from tools.audio_ingest import (
+    open_upload, spooled_stream_factory, record_too_large, record_too_long, ingest_stats, AUDIO_MAX_BYTES,
+)
+from tools.voice_stream import VoiceStream, AudioTooLarge
+from werkzeug.exceptions import RequestEntityTooLarge
+import threading
 import os
+import io
+import json
 from flask_cors import CORS
-from twilio.twiml.messaging_response import MessagingResponse
-from flask import request
-from orchestration import run_agent
+
+class UploadRequest(Request):
+    # voice uploads stay in memory up to VOICE_SPOOL_MAX_BYTES
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return spooled_stream_factory(total_content_length, content_type, filename, content_length)
+
+    @property
+    def max_content_length(self):
+        # VOICE_MAX_BYTES caps /api/voice only, checked while the body streams in;
+        # other routes keep the app-wide MAX_CONTENT_LENGTH
+        if self.endpoint == "api_voice":
+            return AUDIO_MAX_BYTES
+        return super().max_content_length
+
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 CORS(app)
 
+
+try:
+    # optional: /ws/voice needs flask-sock; POST /api/voice works without it
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+# Seconds without a frame before a streamed utterance is abandoned.
+VOICE_WS_IDLE_TIMEOUT = float(os.getenv("VOICE_WS_IDLE_TIMEOUT", "15"))
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def too_large(e):
+    if request.endpoint != "api_voice":
+        return jsonify({"error": "too large"}), 413
+    record_too_large()
+    return jsonify({"error": "too large", "max_bytes": AUDIO_MAX_BYTES}), 413
+
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    response.headers.add('Access-Control-Expose-Headers', 'X-Trace-Id')
     return response 
 
 
 @app.route("/twilio-webhook", methods=["POST"])
 def twilio_webhook():
+    from twilio.twiml.messaging_response import MessagingResponse
+
     from_number = request.form.get("From", "")
     phone = from_number.replace("whatsapp:", "")
 
@@ -36,8 +93,121 @@ def api_text():
     sid = data.get("session_id") or data.get("sid")
     msgs = data.get("messages") or []
     frontend_phone = data.get("frontend_phone")
-    resp = run_agent(msgs, sid, frontend_phone=frontend_phone)
-    return jsonify(resp)
+    if data.get("stream") or request.args.get("stream") == "1":
+        return _stream_text_reply(msgs, sid, frontend_phone)
+    trace_id = new_trace_id()
+    with start_trace("api:text", trace_id=trace_id, sid=sid):
+        resp = run_agent(msgs, sid, frontend_phone=frontend_phone)
+    return _with_trace_id(jsonify(resp), trace_id)
+
+
+def _with_trace_id(response, trace_id):
+    # always set, so a client can quote it; /api/traces only has it when TRACE_ENABLED=1
+    response.headers["X-Trace-Id"] = trace_id
+    return response
+
+
+def _stream_text_reply(msgs, sid, frontend_phone):
+    """
+    NDJSON stream, one JSON object per line:
+      {"event": "draft", "reply_text": <core>, "structured": {...}, ...}
+      {"event": "final", "reply_text": <rewritten>}
+    The draft is flushed before the LLM rewrite starts.
+    """
+    user_text = get_user_text(msgs)
+    # headers go out before the body runs, so the id is fixed up front
+    trace_id = new_trace_id()
+
+    def generate():
+        with start_trace("api:text:stream", trace_id=trace_id, sid=sid):
+            resp = run_agent(msgs, sid, frontend_phone=frontend_phone, rewrite=False)
+            draft = resp.get("reply_text") or ""
+            yield json.dumps({"event": "draft", **resp}) + "\n"
+            final = smart_rewrite(draft, user_text) if (draft and user_text) else draft
+            yield json.dumps({"event": "final", "reply_text": final}) + "\n"
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Trace-Id": trace_id}
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers=headers,
+    )
+
+
+@app.route("/api/metrics", methods=["GET"])
+def api_metrics():
+    return jsonify({
+        "rewrite": rewrite_stats(),
+        "rewrite_cache": rewrite_cache_stats(),
+        "rewrite_policy": rewrite_policy_stats(),
+        "sessions": SESSIONS.stats(),
+        "session_locks": session_lock_stats(),
+        "intent_cache": intent_cache_stats(),
+        "tracing": trace_stats(),
+        "stt": stt_stats(),
+        "stt_pool": stt_pool_stats(),
+        "tts": tts_stats(),
+        "audio_ingest": ingest_stats(),
+        "dialogue": dialogue_stats(),
+        "static_assets": asset_stats(),
+        "startup": startup_report(),
+    })
+
+
+@app.route("/api/traces", methods=["GET"])
+def api_traces():
+    """Recent traces from the in-process ring buffer (?id=<trace id> for one)."""
+    tid = request.args.get("id")
+    if tid:
+        rec = get_trace(tid)
+        return (jsonify(rec), 200) if rec else (jsonify({"error": "not found"}), 404)
+    limit = request.args.get("limit", default=20, type=int)
+    return jsonify({"traces": recent_traces(limit)})
+
+
+@app.route("/api/delivery/<path:key>", methods=["GET"])
+def api_delivery(key):
+    res = delivery_status(key)
+    return jsonify(res), (200 if res.get("ok") else 404)
+
+
+@app.route("/media/<path:filename>", methods=["GET", "HEAD"])
+def media(filename):
+    """
+    Catalog / QR images and reply audio with strong content-hash ETags (304 on If-None-Match).
+    Files go out via send_file, i.e. wsgi.file_wrapper / sendfile under gunicorn;
+    freshly generated QR PNGs are served straight from memory and registered
+    assets (catalog) use the metadata tools/static_assets loaded at startup.
+    """
+    immutable = is_immutable(filename)
+    max_age = IMMUTABLE_MAX_AGE if immutable else MEDIA_MAX_AGE
+
+    data = get_qr_png(filename, read_disk=False) if filename.startswith("qr/") else None
+    asset = None if immutable else find_by_public_path(filename)
+    if data is not None:
+        resp = send_file(
+            io.BytesIO(data), mimetype="image/png",
+            etag=content_etag(data), conditional=True, max_age=max_age,
+        )
+    elif asset is not None:
+        # registry already has hash + sniffed mime; ?v=<version> URLs never change
+        if request.args.get("v") == asset["version"]:
+            immutable, max_age = True, IMMUTABLE_MAX_AGE
+        resp = send_file(
+            asset["path"], mimetype=asset["mime"],
+            etag=asset["etag"], conditional=True, max_age=max_age,
+        )
+    else:
+        if filename.startswith("tts/"):
+            # reply audio is made in the background; the first GET may have to wait for it
+            ensure_audio(filename[4:])
+        path = resolve_media(filename)
+        if not path:
+            return jsonify({"error": "not found"}), 404
+        resp = send_file(path, etag=file_etag(path), conditional=True, max_age=max_age)
+
+    resp.headers["Cache-Control"] = f"public, max-age={max_age}" + (", immutable" if immutable else "")
+    return resp
 
 
 @app.route("/api/voice", methods=["POST"])
@@ -49,38 +219,124 @@ def api_voice():
         return jsonify({"error": "no audio"}), 400
 
     audio_file = request.files["audio"]
-    filename = secure_filename(audio_file.filename)
-    tmp = None
 
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmpf:
-            audio_path = tmpf.name
-            audio_file.save(audio_path)
-            tmp = audio_path
-
-        resp = run_agent(
-            [],
-            session,
-            frontend_phone=frontend_phone,
-            audio_path=audio_path
-        )
+        # decoded from the upload buffer, or from the spilled file by path
+        trace_id = new_trace_id()
+        with open_upload(audio_file) as audio, start_trace("api:voice", trace_id=trace_id, sid=session):
+            resp = run_agent(
+                [],
+                session,
+                frontend_phone=frontend_phone,
+                audio=audio,
+            )
 
-        return jsonify({
+        return _with_trace_id(jsonify({
             "reply_text": resp.get("reply_text"),
             "transcript": resp.get("transcript"),
             "reply_audio_url": resp.get("reply_audio_url"),
             "structured": resp.get("structured", {})
-        })
+        }), trace_id)
+
+    except AudioTooLong:
+        record_too_long()
+        return jsonify({"error": "too long", "max_seconds": STT_MAX_SECONDS}), 413
+
+    except SttBusy:
+        resp = jsonify({"error": "busy", "summary": "Voice transcription is busy, please retry or type your message."})
+        resp.headers["Retry-After"] = "2"
+        return resp, 503
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    finally:
+def ws_voice(ws):
+    """
+    Streamed voice, one utterance per connection.
+    Client → binary frames of MediaRecorder audio (webm/opus), then
+             {"event": "end"} (or the server detects trailing silence).
+    Server → {"event": "partial", "text"} while audio arrives,
+             {"event": "transcript", "text"} at end of utterance,
+             {"event": "reply", "reply_text", "structured", ...} from run_agent,
+             {"event": "error", "error"} on failure.
+    """
+    session = request.args.get("session")
+    frontend_phone = request.args.get("frontend_phone")
+    send_lock = threading.Lock()
+
+    def send(obj):
+        with send_lock:
+            ws.send(json.dumps(obj))
+
+    def on_partial(text):
         try:
-            if tmp and os.path.exists(tmp):
-                os.remove(tmp)
-        except:
+            send({"event": "partial", "text": text})
+        except Exception:
             pass
 
+    stream = None
+    try:
+        # inside the try: a missing ffmpeg must still reach the client as an error event
+        stream = VoiceStream(on_partial=on_partial)
+        idle = 0.0
+        while True:
+            msg = ws.receive(timeout=0.25)
+            if msg is None:
+                # no frame: still check audio decoded since, then give up when idle too long
+                idle += 0.25
+                if stream.poll() or idle >= VOICE_WS_IDLE_TIMEOUT:
+                    break
+                continue
+            idle = 0.0
+            if isinstance(msg, str):
+                if (json.loads(msg or "{}") or {}).get("event") == "end":
+                    break
+                continue
+            if stream.feed(msg):
+                break
+
+        trace_id = new_trace_id()
+        with start_trace("ws:voice", trace_id=trace_id, sid=session):
+            res = stream.finish()
+            if res.get("too_long"):
+                raise AudioTooLong()
+            text = res.get("text") or ""
+            send({"event": "transcript", "text": text})
+            resp = run_agent(
+                [{"role": "user", "parts": [{"text": text}]}] if text else [],
+                session,
+                frontend_phone=frontend_phone,
+            )
+        send({
+            "event": "reply",
+            "reply_text": resp.get("reply_text"),
+            "transcript": text or None,
+            "reply_audio_url": resp.get("reply_audio_url"),
+            "structured": resp.get("structured", {}),
+            "trace_id": trace_id,
+        })
+    except AudioTooLarge:
+        send({"event": "error", "error": "too large", "max_bytes": AUDIO_MAX_BYTES})
+    except AudioTooLong:
+        record_too_long()
+        send({"event": "error", "error": "too long", "max_seconds": STT_MAX_SECONDS})
+    except SttBusy:
+        send({"event": "error", "error": "busy", "summary": "Voice transcription is busy, please retry or type your message."})
+    except Exception as e:
+        try:
+            send({"event": "error", "error": str(e)})
+        except Exception:
+            pass  # socket already gone
+    finally:
+        if stream is not None:
+            stream.close()
+
+
+if Sock is not None:
+    Sock(app).route("/ws/voice")(ws_voice)
+
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
+    # development server only; production runs gunicorn (see gunicorn.conf.py)
+    warm_up()
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)), threaded=True)
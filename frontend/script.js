@@ -95,6 +95,7 @@ function addMessage(text, who = 'agent', ts = null, loadingHistory = false) {
   transcript.scrollTop = transcript.scrollHeight;
 
   if (!loadingHistory) saveMessage(text, who);
+  return wrapper.querySelector('.bubble');
 }
 
 // Show media (QR/catalog/location)
@@ -149,11 +150,70 @@ speechSynthesis.onvoiceschanged = initVoices;
 initVoices();
 
 // ============ BACKEND ============
+function speakReply(text, audioUrl) {
+  if (audioUrl) {
+    // server-side TTS (cached per reply); relative URLs live on the API host
+    const audio = new Audio(new URL(audioUrl, API_BASE).href);
+    audio.play().catch(() => speakReply(text, null));
+  } else if ('speechSynthesis' in window) {
+    const utter = new SpeechSynthesisUtterance(text);
+    utter.rate = 0.9; // slower, more natural
+    if (selectedVoice) utter.voice = selectedVoice;
+    speechSynthesis.cancel();
+    speechSynthesis.speak(utter);
+  }
+}
+
+function showStructured(s) {
+  s = s || {};
+  if (s.qr_url) addMedia(s.qr_url, "image");
+  if (s.catalog_url) addMedia(s.catalog_url, "image");
+  if (s.location_url) addMedia(s.location_url, "link");
+}
+
+// replace the text of the last saved agent message (draft → final rewrite)
+function updateLastSavedMessage(text) {
+  const existing = JSON.parse(sessionStorage.getItem("chatHistory") || "[]");
+  for (let i = existing.length - 1; i >= 0; i--) {
+    if (existing[i].who === 'agent') {
+      existing[i].text = text;
+      break;
+    }
+  }
+  sessionStorage.setItem("chatHistory", JSON.stringify(existing));
+}
+
+// read an NDJSON response line by line as it arrives
+async function readNdjson(res, onEvent) {
+  if (!res.body || !res.body.getReader) {
+    (await res.text()).split("\n").forEach(line => {
+      if (line.trim()) onEvent(JSON.parse(line));
+    });
+    return;
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let nl;
+    while ((nl = buf.indexOf("\n")) >= 0) {
+      const line = buf.slice(0, nl).trim();
+      buf = buf.slice(nl + 1);
+      if (line) onEvent(JSON.parse(line));
+    }
+  }
+  if (buf.trim()) onEvent(JSON.parse(buf));
+}
+
 async function sendToBackend(msg) {
   try {
     const payload = {
       session_id: sessionId,
       frontend_phone: autoPhone,
+      stream: true,
       messages: [
         { role: "user", parts: [{ text: msg }] }
       ]
@@ -170,27 +230,25 @@ async function sendToBackend(msg) {
       return;
     }
 
-    const data = await res.json();
-
-    if (data.reply_text) {
-      addMessage(data.reply_text, 'agent');
-
-      if (data.reply_audio_url) {
-        const audio = new Audio(data.reply_audio_url);
-        audio.play().catch(() => { });
-      } else if ('speechSynthesis' in window) {
-        const utter = new SpeechSynthesisUtterance(data.reply_text);
-        utter.rate = 0.9; // slower, more natural
-        if (selectedVoice) utter.voice = selectedVoice;
-        speechSynthesis.cancel();
-        speechSynthesis.speak(utter);
+    // draft arrives first (shown + spoken right away), rewrite replaces it later
+    let bubble = null;
+    let draftText = "";
+    await readNdjson(res, (data) => {
+      if (data.event === "draft") {
+        draftText = data.reply_text || "";
+        if (draftText) {
+          bubble = addMessage(draftText, 'agent');
+          speakReply(draftText, data.reply_audio_url);
+        }
+        showStructured(data.structured);
+      } else if (data.event === "final") {
+        const finalText = data.reply_text || "";
+        if (bubble && finalText && finalText !== draftText) {
+          bubble.textContent = finalText;
+          updateLastSavedMessage(finalText);
+        }
       }
-    }
-
-    const s = data.structured || {};
-    if (s.qr_url) addMedia(s.qr_url, "image");
-    if (s.catalog_url) addMedia(s.catalog_url, "image");
-    if (s.location_url) addMedia(s.location_url, "link");
+    });
 
   } catch (err) {
     showToast("Network error");
@@ -256,7 +314,8 @@ micButton.addEventListener('pointerdown', (e) => {
   if (!recognition) {
     recognition = initRecognition();
     if (!recognition) {
-      showToast("Voice input not supported in this browser");
+      // no Web Speech API (Firefox, some WebViews): stream to the server instead
+      startStreamingVoice();
       return;
     }
 
@@ -298,7 +357,11 @@ micButton.addEventListener('pointerdown', (e) => {
 
 micButton.addEventListener('pointerup', (e) => {
   e.preventDefault();
-  if (!recognition || !isListening) return;
+  if (!recognition) {
+    stopStreamingVoice();
+    return;
+  }
+  if (!isListening) return;
   try {
     recognition.stop();
   } catch {
@@ -306,6 +369,109 @@ micButton.addEventListener('pointerup', (e) => {
   }
 });
 
+// ============ VOICE FALLBACK (stream mic audio to /ws/voice, server-side STT) ============
+let voiceSocket = null;
+let mediaRecorder = null;
+let voiceHeld = false;
+
+function resetMic() {
+  isListening = false;
+  micArea.classList.remove('listening');
+  micLabel.textContent = "Hold to talk";
+}
+
+function stopStreamingVoice() {
+  voiceHeld = false;
+  if (mediaRecorder && mediaRecorder.state !== "inactive") {
+    mediaRecorder.stop();
+  }
+}
+
+async function startStreamingVoice() {
+  if (!window.MediaRecorder || !navigator.mediaDevices || !window.WebSocket) {
+    showToast("Voice input not supported in this browser");
+    return;
+  }
+  voiceHeld = true;
+  let stream;
+  try {
+    stream = await navigator.mediaDevices.getUserMedia({ audio: true });
+  } catch {
+    voiceHeld = false;
+    showToast("Microphone permission denied");
+    return;
+  }
+  if (!voiceHeld) {
+    // released before the mic opened
+    stream.getTracks().forEach(t => t.stop());
+    return;
+  }
+
+  const params = new URLSearchParams({ session: sessionId });
+  if (autoPhone) params.set("frontend_phone", autoPhone);
+  const ws = new WebSocket(`${API_BASE.replace(/^http/, "ws")}/ws/voice?${params}`);
+  const mime = "audio/webm;codecs=opus";
+  const rec = new MediaRecorder(stream, MediaRecorder.isTypeSupported(mime) ? { mimeType: mime } : undefined);
+  voiceSocket = ws;
+  mediaRecorder = rec;
+
+  rec.ondataavailable = (ev) => {
+    if (ev.data && ev.data.size && ws.readyState === WebSocket.OPEN) ws.send(ev.data);
+  };
+  rec.onstop = () => {
+    stream.getTracks().forEach(t => t.stop());
+    resetMic();
+    // last chunk has been sent by now
+    if (ws.readyState === WebSocket.OPEN) ws.send(JSON.stringify({ event: "end" }));
+  };
+
+  ws.onopen = () => {
+    if (!voiceHeld) {
+      stream.getTracks().forEach(t => t.stop());
+      ws.close();
+      return;
+    }
+    rec.start(250); // small chunks so the server decodes while we talk
+    isListening = true;
+    micArea.classList.add('listening');
+    micLabel.textContent = "Listening...";
+  };
+
+  ws.onmessage = (ev) => {
+    let data;
+    try {
+      data = JSON.parse(ev.data);
+    } catch {
+      return;
+    }
+    if (data.event === "partial") {
+      micLabel.textContent = data.text;
+    } else if (data.event === "transcript") {
+      // server heard the end of the utterance
+      stopStreamingVoice();
+      if (data.text) addMessage(data.text, 'user');
+    } else if (data.event === "reply") {
+      addMessage(data.reply_text || "...", 'agent');
+      speakReply(data.reply_text || "", data.reply_audio_url);
+      showStructured(data.structured);
+      ws.close();
+    } else if (data.event === "error") {
+      showToast(data.summary || "Voice error");
+      stopStreamingVoice();
+      ws.close();
+    }
+  };
+
+  ws.onerror = () => {
+    showToast("Voice connection error");
+    stopStreamingVoice();
+  };
+  ws.onclose = () => {
+    stopStreamingVoice();
+    if (voiceSocket === ws) voiceSocket = null;
+  };
+}
+
 // ============ INIT ============
 loadChatHistory();
 if (transcript.children.length === 0) {
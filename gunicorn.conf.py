@@ -0,0 +1,49 @@
+# gunicorn.conf.py — production serving for app:app
+# Procfile: web: gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Threaded workers: a turn blocked on Gemini/Twilio/SQLite holds one thread,
+# not the whole process. Scale with threads first; more than one worker needs
+# the shared sqlite session store and its cross-process session lock.
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+threads = int(os.getenv("WEB_THREADS", "16"))
+
+timeout = int(os.getenv("WEB_TIMEOUT", "60"))
+# On SIGTERM workers stop accepting and get this long to finish in-flight turns.
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+
+# Each worker imports the app itself: thread pools and sqlite connections
+# must not be created before fork.
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+
+# In-memory sessions would be split across workers (sqlite also turns on the
+# flock-based per-session lock in tools/session_lock).
+if workers > 1:
+    os.environ.setdefault("SESSION_STORE", "sqlite")
+
+
+def post_worker_init(worker):
+    # runs after the app is imported and before the worker accepts connections.
+    # Only the DB and outbox are set up here; model loads (whisper, piper
+    # templates, dateparser, Gemini) can take longer than `timeout` on a cold
+    # host, so they run on a background thread instead of blocking the
+    # worker's first heartbeat (the arbiter would kill it and it would boot-loop).
+    from orchestration import warm_up
+
+    warm_up(background=True)
+
+
+def worker_exit(server, worker):
+    from tools.outbox import stop_workers
+    from tools.stt_pool import stop_stt_pool
+
+    stop_workers(timeout=graceful_timeout)
+    # each web worker owns STT_WORKERS transcription processes
+    stop_stt_pool()
@@ -1,69 +1,151 @@
 ﻿import os
-import time
 import re
+import threading
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 
-from dotenv import load_dotenv
-load_dotenv()
+from tools.startup import load_config, lazy_import, timed, format_startup_report
+load_config()
 
 from tools.detect_intent_tool import detect_intent_cached
-from tools.slot_extractor import extract_slots_from_text
-from tools.validate_datetime_tool import validate_datetime
+from tools.intent_matcher import scan_text
+from tools.slot_extractor import extract_slot_details
+from tools.validate_datetime_tool import validate_datetime, warm_up as warm_up_datetime
 from tools.save_Booking import init_db, save_booking, get_booking_by_id, cancel_booking
 from tools.generate_qr_code import generate_upi_qr
 from tools.send_price_catalog import send_price_catalog
 from tools.send_location import send_location
-from tools.send_whatsapp_text import send_whatsapp_text
-from tools.send_owner_msg import notify_owner
-from tools.missingInfoTool import request_missing_info
-from tools.speech_to_text import transcribe_webm
+from tools.outbox import enqueue_message, start_workers
+from tools.session_store import build_session_store, trim_history
+from tools.session_lock import session_lock, SessionBusy
+from tools.stt_pool import transcribe_audio, start_stt_pool
+from tools.speech_to_text import AudioTooLong
+from tools.text_to_speech import reply_audio_url, presynthesize
+from tools.rewrite_engine import call_with_deadline, REWRITE_TIMEOUT
+from tools.rewrite_cache import get_cached_rewrite, store_rewrite, tone_class
+from tools.rewrite_policy import should_rewrite
+from tools.dialogue_fsm import DialogueMachine, Transition, Turn, Reply, always
+from tools.tracing import span
+
+
+# google.generativeai (grpc, protobuf) is the heaviest import; built on first rewrite
+genai = lazy_import("google.generativeai")
 
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-lite")
+GEMINI_TIMEOUT = REWRITE_TIMEOUT
+_gemini = None
+_gemini_lock = threading.Lock()
 
-from google.generativeai import GenerativeModel
 
-GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-lite")
-gemini = GenerativeModel(GEMINI_MODEL)
-GEMINI_TIMEOUT = 4  
+def get_gemini():
+    global _gemini
+    if _gemini is None:
+        with _gemini_lock:
+            if _gemini is None:
+                with timed("init:gemini_model"):
+                    _gemini = genai.GenerativeModel(GEMINI_MODEL)
+    return _gemini
 
 BUSINESS_NAME = os.getenv("BUSINESS_NAME", "Aarush AI Solutions")
 CURRENCY = os.getenv("CURRENCY", "₹")
 AGENT_BASE_INR = int(os.getenv("AGENT_BASE_INR", "15000"))
 CALL_BASE_INR = int(os.getenv("CALL_BASE_INR", "0"))
 
-# DB init
-init_db()
+def warm_up(background: Optional[bool] = None) -> None:
+    """
+    Build per-process resources before the first request
+    (called from gunicorn post_worker_init and the dev server).
+    The DB and outbox are ready before this returns. dateparser, the STT
+    pool, TTS templates and Gemini load on a background thread (gunicorn
+    always; dev server unless WARM_UP_BACKGROUND=0) so slow model loads never
+    hold up the worker; a turn that needs one first waits for / times out on it.
+    Prints the startup timing report when done.
+    """
+    if background is None:
+        background = os.getenv("WARM_UP_BACKGROUND", "1") == "1"
+
+    with timed("init:bookings_db"):
+        init_db()
+        get_booking_by_id("__warmup__")
+    # resume delivery of messages queued before a restart
+    with timed("init:outbox_workers"):
+        start_workers()
+
+    def _heavy():
+        with timed("init:dateparser"):
+            warm_up_datetime()
+        with timed("init:stt_pool"):
+            start_stt_pool()
+        # fixed drafts are served from the audio cache from the first turn
+        with timed("init:tts_templates"):
+            presynthesize(TEMPLATE_REPLIES)
+        get_gemini()
+        if os.getenv("GEMINI_WARMUP", "0") == "1":
+            # one tiny call opens the HTTP channel so the first user turn doesn't pay for it
+            with timed("init:gemini_first_call"):
+                call_with_deadline(_generate_rewrite, "Reply with OK.", timeout=GEMINI_TIMEOUT)
+        print(format_startup_report(), flush=True)
+
+    if background:
+        threading.Thread(target=_heavy, name="warm-up", daemon=True).start()
+    else:
+        _heavy()
 
 
 
+def _generate_rewrite(prompt: str) -> str:
+    out = get_gemini().generate_content(
+        [prompt], request_options={"timeout": GEMINI_TIMEOUT}
+    )
+    return (out.text or "").strip()
+
+
 def smart_rewrite(core: str, user_text: str) -> str:
     """
-    Only rewrite to improve tone, no hallucinations, max 1 call, timed out at 4s.
-    If timeout/error → return core unmodified.
+    Only rewrite to improve tone, no hallucinations, max 1 call, hard deadline of GEMINI_TIMEOUT.
+    Runs on the bounded rewrite pool; if the budget expires, the pool is
+    saturated, or the call errors → return core unmodified.
+    Structured/transactional drafts (IDs, URLs, amounts, bullet lists) skip
+    the LLM entirely; repeated drafts are served from the rewrite cache.
     """
-    try:
-        prompt = (
-            "Rewrite the reply to sound natural, concise, and human-like, matching the user's tone. "
-            "If the user is casual (e.g. says 'bro', 'dude', 'yaar'), you can be slightly casual, "
-            "but stay professional and not cringey. "
-            "Do not add emojis. Do not add external world facts. "
-            "Keep it under 2 sentences. "
-            f"User said: {user_text}\n"
-            f"Draft reply: {core}\n"
-            "Return improved reply only, nothing else."
-        )
-
-        start = time.time()
-        out = gemini.generate_content([prompt])
-        if time.time() - start > GEMINI_TIMEOUT:
+    with span("rewrite") as sp:
+        if not should_rewrite(core):
+            sp.set("outcome", "skipped")
             return core
 
-        text = (out.text or "").strip()
-        if len(text) < 3:
-            return core
-        return text
-    except Exception:
+        cached = get_cached_rewrite(core, user_text)
+        if cached:
+            sp.set("outcome", "cached")
+            return cached
+        return _rewrite_with_llm(core, user_text, sp)
+
+
+def _rewrite_with_llm(core: str, user_text: str, sp) -> str:
+    # only the tone class goes to the LLM, never the user's words: the result is
+    # cached per (draft, tone) and served to other sessions
+    tone = tone_class(user_text)
+    style = (
+        "The user writes casually, so you can be slightly casual, but stay professional and not cringey. "
+        if tone == "casual" else
+        "The user writes formally; keep a friendly, professional tone. "
+    )
+    prompt = (
+        "Rewrite the reply to sound natural, concise, and human-like. "
+        + style +
+        "Do not add emojis. Do not add external world facts. "
+        "Keep it under 2 sentences. "
+        f"Draft reply: {core}\n"
+        "Return improved reply only, nothing else."
+    )
+
+    with span("llm:gemini"):
+        text = call_with_deadline(_generate_rewrite, prompt, fallback=None, timeout=GEMINI_TIMEOUT)
+    if not text or len(text) < 3:
+        sp.set("outcome", "fallback")
         return core
+    sp.set("outcome", "llm")
+    store_rewrite(core, user_text, text)
+    return text
 
 
 
@@ -95,39 +177,16 @@ def split_phone(raw: str) -> Dict[str, str]:
 
 def extract_all_slots(user_text: str, slots: Dict[str, Any]) -> List[str]:
     """
-    Robust slot extraction:
-    1) rule extract
-    2) missingInfoTool
-    3) name fallback
-    4) phone fallback
+    Robust slot extraction in one call (tools.slot_extractor.extract_slot_details):
+    rule patterns, plain/two-word name fallbacks, and the phone + country code split.
     Returns list of slot keys that were newly filled this turn.
     """
     before = dict(slots)
-    # 1) rule-based
-    rule = extract_slots_from_text(user_text) or {}
-    for k, v in rule.items():
-        if v and not slots.get(k):
-            slots[k] = v
-
-    # 2) missing-info-tool
-    extra = request_missing_info(user_text, slots) or {}
-    for k, v in (extra.get("slots_found") or {}).items():
+    for k, found in extract_slot_details(user_text).items():
+        v = found["value"]
         if v and not slots.get(k):
             slots[k] = v
 
-    # 3) name fallback: two words
-    parts = user_text.strip().split()
-    if len(parts) >= 2 and not slots.get("name"):
-        if all(p[0].isalpha() for p in parts[:2]):
-            slots["name"] = " ".join(parts[:2])
-
-    # 4) phone fallback
-    parsed = split_phone(user_text)
-    if parsed.get("phone") and not slots.get("phone"):
-        slots["phone"] = parsed["phone"]
-    if parsed.get("country_code") and not slots.get("country_code"):
-        slots["country_code"] = parsed["country_code"]
-
     changed = []
     for k, _ in REQ_ORDER:
         if slots.get(k) and slots.get(k) != before.get(k):
@@ -155,19 +214,25 @@ def price_for(mode: str, genre: str) -> int:
 #   SMALL TALK / CLASSIFICATION
 # ============================================================
 
-def small_talk_basic(text: str) -> Optional[str]:
-    t = (text or "").lower()
-    if any(w in t for w in ["hi", "hello", "hey"]):
-        return f"Hey — I’m the AI assistant for {BUSINESS_NAME}. How can I help?"
-    if "how are you" in t:
-        return "I’m doing well and ready to help with your bookings."
-    if "who are you" in t:
-        return (
-            f"I’m the AI assistant for {BUSINESS_NAME}. "
-            "I can help you book an AI agent, schedule a call, share pricing or send our location."
-        )
-    if any(w in t for w in ["wait", "hold on", "one sec", "hmm"]):
-        return "Sure — take your time."
+# keyword group → reply, checked in this order
+SMALL_TALK_REPLIES = {
+    "greet_kw": f"Hey — I’m the AI assistant for {BUSINESS_NAME}. How can I help?",
+    "how_are_you_kw": "I’m doing well and ready to help with your bookings.",
+    "who_are_you_kw": (
+        f"I’m the AI assistant for {BUSINESS_NAME}. "
+        "I can help you book an AI agent, schedule a call, share pricing or send our location."
+    ),
+    "wait_kw": "Sure — take your time.",
+}
+SMALL_TALK_DEFAULT = "I’m here and listening."
+
+
+def small_talk_basic(text: str, hits: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    if hits is None:
+        hits = scan_text(text or "")
+    for kw, reply in SMALL_TALK_REPLIES.items():
+        if kw in hits:
+            return reply
     return None
 
 def classify_question(text: str) -> Optional[str]:
@@ -204,7 +269,7 @@ def classify_question(text: str) -> Optional[str]:
 #   MAIN SESSION + AGENT
 # ============================================================
 
-SESSIONS: Dict[str, Dict[str, Any]] = {}
+SESSIONS = build_session_store()
 
 def get_user_text(msgs: List[Dict[str, Any]]) -> str:
     for m in reversed(msgs):
@@ -222,7 +287,7 @@ def ensure_session(sid: str, frontend_phone: Optional[str]) -> Dict[str, Any]:
             "pending_proposal": None,
             "last_booking_id": None,
         }
-        SESSIONS[sid] = sess
+        SESSIONS.put(sid, sess)
 
     # pre-fill phone from URL once
     if frontend_phone and not sess["slots"].get("phone"):
@@ -240,532 +305,480 @@ def run_agent(
     sid: str,
     frontend_phone: Optional[str] = None,
     audio_path: Optional[str] = None,
+    rewrite: bool = True,
+    audio: Any = None,
 ) -> Dict[str, Any]:
+    """
+    One conversational turn.
+    Voice turns pass either audio_path or `audio` (an in-memory upload from
+    tools/audio_ingest.open_upload: in memory, or the spilled file's path).
+    Raises AudioTooLong for voice messages over VOICE_MAX_SECONDS.
+    rewrite=False returns the deterministic draft as reply_text, so callers
+    (the streaming /api/text mode) can deliver it first and rewrite after.
+    """
+    # one turn per session at a time (double-tap, voice + text racing);
+    # different sessions never wait on each other
+    try:
+        with session_lock(sid):
+            with span("session:load"):
+                sess = ensure_session(sid, frontend_phone)
+            try:
+                return _run_turn(sess, msgs, sid, audio if audio is not None else audio_path, rewrite)
+            finally:
+                # write back: the sqlite store holds a copy, not this dict
+                with span("session:save"):
+                    SESSIONS.put(sid, sess)
+    except SessionBusy:
+        return {
+            "reply_text": SESSION_BUSY_REPLY,
+            "transcript": None,
+            "reply_audio_url": reply_audio_url(SESSION_BUSY_REPLY),
+            "structured": {},
+        }
 
-    sess = ensure_session(sid, frontend_phone)
 
+def _run_turn(
+    sess: Dict[str, Any],
+    msgs: List[Dict[str, Any]],
+    sid: str,
+    audio: Any,
+    rewrite: bool,
+) -> Dict[str, Any]:
     # ---- transcription or plain text ----
-    if audio_path:
-        user_text = transcribe_webm(audio_path) or "[voice message]"
+    if audio is not None:
+        # on the STT worker processes; raises SttBusy when they are saturated
+        with span("stt:transcribe"):
+            res = transcribe_audio(audio)
+        if res.get("too_long"):
+            # caller answers 413; nothing of this turn is kept
+            raise AudioTooLong()
+        user_text = res["text"] or "[voice message]"
     else:
         user_text = get_user_text(msgs)
 
     if not user_text:
         return {
-            "reply_text": "I didn’t quite catch that — could you type it again?",
+            "reply_text": NOT_CAUGHT_REPLY,
             "transcript": None,
-            "reply_audio_url": None,
+            "reply_audio_url": reply_audio_url(NOT_CAUGHT_REPLY),
             "structured": {},
         }
 
-    low = user_text.lower()
     sess["hist"].append({"ts": datetime.utcnow().isoformat(), "user": user_text})
+    trim_history(sess)
+
+    # ---- features: one intent/keyword scan + question type for every guard ----
+    with span("intent:detect"):
+        intent_info = detect_intent_cached(user_text, allow_llm=False)
+    with span("intent:classify_question"):
+        qtype = classify_question(user_text)
+    turn = Turn(
+        sess, sid, user_text,
+        intent=intent_info.get("intent", "unknown"),
+        hits=intent_info.get("hits") or {},
+        qtype=qtype,
+    )
 
-    # ---- intent detection ----
-    intent_info = detect_intent_cached(user_text, allow_llm=False)
-    intent = intent_info.get("intent", "unknown")
+    fired, (core, structured) = DIALOGUE.dispatch(turn)
+    sess["last_transition"] = fired
+    sess["hist"][-1]["transition"] = fired
 
-    # --------------------------------------------------------
-    # GLOBAL: company questions (any stage)
-    # --------------------------------------------------------
-    qtype = classify_question(user_text)
-    if qtype == "company":
-        core = (
-            f"{BUSINESS_NAME} builds custom AI agents for businesses. "
-            "They can answer customer queries, generate leads, and handle bookings over voice, chat, or WhatsApp."
-        )
-        miss = missing_slots(sess["slots"])
-        if sess["stage"] == "collect" and miss:
-            core += f" For your current booking, I still need: {', '.join(slot_human_name(m) for m in miss)}."
-        reply = smart_rewrite(core, user_text)
-        return {
-            "reply_text": reply,
-            "transcript": None,
-            "reply_audio_url": None,
-            "structured": {},
-        }
+    reply = smart_rewrite(core, user_text) if rewrite else core
+    return {
+        "reply_text": reply,
+        "transcript": user_text if audio is not None else None,
+        # URL only: audio is made off this thread (and outside the session lock)
+        "reply_audio_url": reply_audio_url(reply),
+        "structured": structured,
+    }
 
-    # --------------------------------------------------------
-    # GLOBAL: catalog (price list) — works even mid-booking
-    # --------------------------------------------------------
-    if intent == "get_catalog" or any(k in low for k in ["price", "pricing", "catalog"]):
-        res = send_price_catalog(session=sid, phone=None)
-        if not res.get("ok"):
-            core = "I couldn’t prepare the price catalog right now. Please try again in a bit."
-            reply = smart_rewrite(core, user_text)
-            return {
-                "reply_text": reply,
-                "transcript": None,
-                "reply_audio_url": None,
-                "structured": {},
-            }
-
-        url = res.get("catalog_url") or res.get("public_url")
-        core = f"Here’s the pricing catalog for our AI agents: {url}"
-        miss = missing_slots(sess["slots"])
-        if sess["stage"] in ("collect", "confirm") and miss:
-            core += f" For your booking, I still need: {', '.join(slot_human_name(m) for m in miss)}."
-        reply = smart_rewrite(core, user_text)
-        return {
-            "reply_text": reply,
-            "transcript": None,
-            "reply_audio_url": None,
-            "structured": {"catalog_url": url} if url else {},
-        }
 
-    # --------------------------------------------------------
-    # GLOBAL: location — works even mid-booking
-    # --------------------------------------------------------
-    if intent == "get_location" or any(k in low for k in ["location", "address", "where are you"]):
-        res = send_location(session=sid, phone=None)
-        if not res.get("ok"):
-            core = "I couldn’t fetch the office location right now. Please try again later."
-            reply = smart_rewrite(core, user_text)
-            return {
-                "reply_text": reply,
-                "transcript": None,
-                "reply_audio_url": None,
-                "structured": {},
-            }
-        url = res.get("location_url")
-        txt = res.get("text", "Here’s our office location.")
-        core = f"{txt}. You can open it here: {url}"
-        miss = missing_slots(sess["slots"])
-        if sess["stage"] in ("collect", "confirm") and miss:
-            core += f" For your booking, I still need: {', '.join(slot_human_name(m) for m in miss)}."
-        reply = smart_rewrite(core, user_text)
-        return {
-            "reply_text": reply,
-            "transcript": None,
-            "reply_audio_url": None,
-            "structured": {"location_url": url} if url else {},
-        }
+# ============================================================
+#   DIALOGUE TABLE — guards, stage hooks, actions
+# ============================================================
 
-    # --------------------------------------------------------
-    # GLOBAL: small talk
-    # --------------------------------------------------------
-    if intent == "small_talk":
-        base = small_talk_basic(user_text)
-        if not base:
-            base = "I’m here and listening."
-        miss = missing_slots(sess["slots"])
-        if sess["stage"] == "collect" and miss:
-            base += f" For your booking, I still need: {', '.join(slot_human_name(m) for m in miss)}."
-        reply = smart_rewrite(base, user_text)
-        return {
-            "reply_text": reply,
-            "transcript": None,
-            "reply_audio_url": None,
-            "structured": {},
-        }
+def _still_need(miss: List[str]) -> str:
+    return ", ".join(slot_human_name(m) for m in miss)
 
-    # --------------------------------------------------------
-    # GLOBAL: payment intent (any stage) → pay for last booking
-    # --------------------------------------------------------
-    if intent == "pay" or any(k in low for k in ["upi", "qr code", "pay now", "payment"]):
-        bid = sess.get("last_booking_id")
-        if not bid:
-            core = "I don’t see a recent booking to pay for yet. Once you confirm a booking, I can generate a UPI QR for it."
-            reply = smart_rewrite(core, user_text)
-            return {
-                "reply_text": reply,
-                "transcript": None,
-                "reply_audio_url": None,
-                "structured": {},
-            }
-
-        bk = get_booking_by_id(bid)
-        if not bk.get("ok"):
-            core = "I couldn’t find that booking right now. Please try again in a moment."
-            reply = smart_rewrite(core, user_text)
-            return {
-                "reply_text": reply,
-                "transcript": None,
-                "reply_audio_url": None,
-                "structured": {},
-            }
-
-        booking = bk["booking"]
-        amount = booking.get("final_amount", price_for(booking.get("type", "agent"), booking.get("agent_type", "other")))
-        cc = sess["slots"].get("country_code", "") or ""
-        ph = sess["slots"].get("phone", "") or ""
-        full_phone = ph if ph.startswith("+") else f"{cc}{ph}" if ph else ""
-
-        qr = generate_upi_qr(booking_id=str(bid), amount=amount, phone=full_phone)
-        if not qr.get("ok"):
-            core = "I couldn’t generate the payment QR right now. Please try again later."
-            reply = smart_rewrite(core, user_text)
-            return {
-                "reply_text": reply,
-                "transcript": None,
-                "reply_audio_url": None,
-                "structured": {},
-            }
-
-        url = qr.get("qr_url") or qr.get("public_url")
-
-        if full_phone:
-            try:
-                send_whatsapp_text(
-                    to=full_phone,
-                    body=f"Your payment QR for Booking ID {bid} is ready in the web app. Amount: {CURRENCY}{amount}.",
-                )
-            except Exception:
-                pass
-
-        core = f"Here’s your UPI QR for Booking ID {bid}. You can scan it to pay {CURRENCY}{amount} now, or pay offline later."
-        reply = smart_rewrite(core, user_text)
-        sess["stage"] = "done"
-        return {
-            "reply_text": reply,
-            "transcript": None,
-            "reply_audio_url": None,
-            "structured": {"qr_url": url} if url else {},
-        }
 
-    # --------------------------------------------------------
-    # STAGE: idle → decide booking mode
-    # --------------------------------------------------------
-    if sess["stage"] == "idle":
-        # decide between agent / call
-        mode = None
-        if intent == "book_agent" or "ai agent" in low or "book an agent" in low:
-            mode = "agent"
-        elif intent == "book_call" or "book a call" in low or ("call" in low and "back" not in low):
-            mode = "call"
-
-        if mode:
-            sess["stage"] = "collect"
-            sess["slots"]["mode"] = mode
-
-            cc = sess["slots"].get("country_code", "")
-            ph = sess["slots"].get("phone", "")
-            if ph:
-                disp = f"{cc}{ph}" if cc else ph
-                core = (
-                    f"Great — let’s book your {mode}. I see your phone as {disp}. "
-                    "You can use this or send a different number.\n"
-                    "I’ll need your full name, country calling code (like +91 or +1), phone number, date, time, "
-                    "and agent category (gym / salon / restaurant / other). You can send these in any order."
-                )
-            else:
-                core = (
-                    f"Great — let’s book your {mode}. "
-                    "I’ll need your full name, country calling code (like +91 or +1), phone number, date, time, "
-                    "and agent category (gym / salon / restaurant / other). You can send these in any order."
-                )
-            reply = smart_rewrite(core, user_text)
-            return {
-                "reply_text": reply,
-                "transcript": None,
-                "reply_audio_url": None,
-                "structured": {},
-            }
-
-        # idle generic
-        core = (
-            f"I’m the AI assistant for {BUSINESS_NAME}. "
-            "I can book an AI agent for your business, schedule a call, show pricing, or send our location. "
-            "What would you like to do?"
+def _with_missing(turn: Turn, core: str, stages, lead: str = "For your booking, I still need") -> str:
+    miss = missing_slots(turn.slots)
+    if turn.stage in stages and miss:
+        core += f" {lead}: {_still_need(miss)}."
+    return core
+
+
+def _session_phone(slots: Dict[str, Any]) -> str:
+    cc = slots.get("country_code", "") or ""
+    ph = slots.get("phone", "") or ""
+    return ph if ph.startswith("+") else f"{cc}{ph}" if ph else ""
+
+
+def _booking_amount(booking: Dict[str, Any]) -> Any:
+    return booking.get("final_amount", price_for(booking.get("type", "agent"), booking.get("agent_type", "other")))
+
+
+def _send_qr(bid: str, amount: Any, full_phone: str) -> Optional[Dict[str, Any]]:
+    """UPI QR for a booking + queued WhatsApp nudge; returns structured payload or None on failure."""
+    qr = generate_upi_qr(booking_id=str(bid), amount=amount, phone=full_phone)
+    if not qr.get("ok"):
+        return None
+    url = qr.get("qr_url") or qr.get("public_url")
+    if full_phone:
+        enqueue_message(
+            "whatsapp",
+            to=full_phone,
+            body=f"Your payment QR for Booking ID {bid} is ready in the web app. Amount: {CURRENCY}{amount}.",
+            idem_key=f"{bid}:qr",
         )
-        reply = smart_rewrite(core, user_text)
-        return {
-            "reply_text": reply,
-            "transcript": None,
-            "reply_audio_url": None,
-            "structured": {},
-        }
+    return {"qr_url": url} if url else {}
+
+
+QR_FAILED = "I couldn’t generate the payment QR right now. Please try again later."
+SESSION_BUSY_REPLY = "I’m still working on your previous message — give me a second and try again."
+NOT_CAUGHT_REPLY = "I didn’t quite catch that — could you type it again?"
+COMPANY_REPLY = (
+    f"{BUSINESS_NAME} builds custom AI agents for businesses. "
+    "They can answer customer queries, generate leads, and handle bookings over voice, chat, or WhatsApp."
+)
+BOOKING_ASK = (
+    "I’ll need your full name, country calling code (like +91 or +1), phone number, date, time, "
+    "and agent category (gym / salon / restaurant / other). You can send these in any order."
+)
+IDLE_MENU_REPLY = (
+    f"I’m the AI assistant for {BUSINESS_NAME}. "
+    "I can book an AI agent for your business, schedule a call, show pricing, or send our location. "
+    "What would you like to do?"
+)
+CHANGE_REPLY = "No problem — tell me what you’d like to change (name, phone, date, time, or agent category)."
+CONFIRM_HINT_REPLY = "To continue, reply 'confirm' to finalize your booking, or 'change' to adjust any detail."
+NO_BOOKING_REPLY = "I don’t see a booking in progress. You can say 'book an AI agent' or 'book a call' to start."
+PAYMENT_HINT_REPLY = (
+    "Would you like to pay now using a UPI QR code, or pay offline at the time of service? "
+    "You can say 'UPI' or 'offline'."
+)
+FALLBACK_REPLY = (
+    "I can help you with new bookings, pricing, location, or payments. "
+    "You can say 'book an AI agent', 'book a call', 'show price catalog', or 'send office location'."
+)
+
+# replies that never vary; their audio is synthesized at startup. That audio is
+# what gets played when the draft itself is spoken: the streaming /api/text
+# draft, and any reply the rewrite policy leaves alone. LLM-rewritten text is a
+# different cache key and is synthesized on first use.
+TEMPLATE_REPLIES = (
+    SESSION_BUSY_REPLY, NOT_CAUGHT_REPLY, COMPANY_REPLY, IDLE_MENU_REPLY,
+    CHANGE_REPLY, CONFIRM_HINT_REPLY, NO_BOOKING_REPLY, PAYMENT_HINT_REPLY, FALLBACK_REPLY,
+    *SMALL_TALK_REPLIES.values(), SMALL_TALK_DEFAULT,
+    f"Great — let’s book your agent. {BOOKING_ASK}",
+    f"Great — let’s book your call. {BOOKING_ASK}",
+)
+
+
+# ---- global (any stage) ----
+
+def _do_company(turn: Turn) -> Reply:
+    return _with_missing(turn, COMPANY_REPLY, ("collect",), "For your current booking, I still need"), {}
+
+
+def _do_catalog(turn: Turn) -> Reply:
+    res = send_price_catalog(session=turn.sid, phone=None)
+    if not res.get("ok"):
+        return "I couldn’t prepare the price catalog right now. Please try again in a bit.", {}
+    url = res.get("catalog_url") or res.get("public_url")
+    core = f"Here’s the pricing catalog for our AI agents: {url}"
+    return _with_missing(turn, core, ("collect", "confirm")), ({"catalog_url": url} if url else {})
+
+
+def _do_location(turn: Turn) -> Reply:
+    res = send_location(session=turn.sid, phone=None)
+    if not res.get("ok"):
+        return "I couldn’t fetch the office location right now. Please try again later.", {}
+    url = res.get("location_url")
+    txt = res.get("text", "Here’s our office location.")
+    core = f"{txt}. You can open it here: {url}"
+    return _with_missing(turn, core, ("collect", "confirm")), ({"location_url": url} if url else {})
+
+
+def _do_small_talk(turn: Turn) -> Reply:
+    base = small_talk_basic(turn.user_text, turn.hits) or SMALL_TALK_DEFAULT
+    return _with_missing(turn, base, ("collect",)), {}
+
+
+def _do_pay(turn: Turn) -> Reply:
+    bid = turn.sess.get("last_booking_id")
+    if not bid:
+        return "I don’t see a recent booking to pay for yet. Once you confirm a booking, I can generate a UPI QR for it.", {}
+
+    bk = get_booking_by_id(bid)
+    if not bk.get("ok"):
+        return "I couldn’t find that booking right now. Please try again in a moment.", {}
+
+    amount = _booking_amount(bk["booking"])
+    structured = _send_qr(bid, amount, _session_phone(turn.slots))
+    if structured is None:
+        return QR_FAILED, {}
+    turn.sess["stage"] = "done"
+    return f"Here’s your UPI QR for Booking ID {bid}. You can scan it to pay {CURRENCY}{amount} now, or pay offline later.", structured
+
+
+# ---- idle ----
+
+def _booking_mode(turn: Turn) -> Optional[str]:
+    if turn.intent == "book_agent" or "agent_kw" in turn.hits:
+        return "agent"
+    if turn.intent == "book_call" or ("call_kw" in turn.hits and "back_kw" not in turn.hits):
+        return "call"
+    return None
 
-    # --------------------------------------------------------
-    # STAGE: collect → gather fields in any order
-    # --------------------------------------------------------
-    if sess["stage"] == "collect":
-        filled_now = extract_all_slots(user_text, sess["slots"])
-
-        # validate date+time as soon as both are present
-        if sess["slots"].get("date") and sess["slots"].get("time"):
-            dt_str = f"{sess['slots']['date']} {sess['slots']['time']}"
-            v = validate_datetime(dt_str)
-            if not v.get("ok", True):
-                sess["slots"].pop("date", None)
-                sess["slots"].pop("time", None)
-                core = v.get("summary", "The date and time don’t look valid. Please send a future date and time.")
-                reply = smart_rewrite(core, user_text)
-                return {
-                    "reply_text": reply,
-                    "transcript": None,
-                    "reply_audio_url": None,
-                    "structured": {},
-                }
-
-        miss = missing_slots(sess["slots"])
-
-        if miss:
-            if filled_now:
-                nice_filled = ", ".join(slot_human_name(s) for s in filled_now)
-                nice_miss = ", ".join(slot_human_name(m) for m in miss)
-                core = f"Got it — I’ve saved your {nice_filled}. I still need: {nice_miss}. Send whichever is easiest next."
-            else:
-                # classification for non-slot questions mid-flow
-                q = classify_question(user_text)
-                nice_miss = ", ".join(slot_human_name(m) for m in miss)
-                if q == "external":
-                    core = (
-                        "I don’t have access to general external information like presidents or world facts. "
-                        f"For your booking, I still need: {nice_miss}."
-                    )
-                elif q == "personality":
-                    core = (
-                        "I’m an AI agent without human-style feelings or opinions. "
-                        f"For your booking, I still need: {nice_miss}."
-                    )
-                elif q == "random":
-                    core = (
-                        "I’m mainly focused on helping with your booking, pricing, and our AI agents. "
-                        f"Right now I still need: {nice_miss}."
-                    )
-                else:
-                    core = (
-                        f"I’m not sure which detail that was. For your booking, I still need: {nice_miss}. "
-                        "You can send any one of these."
-                    )
-            reply = smart_rewrite(core, user_text)
-            return {
-                "reply_text": reply,
-                "transcript": None,
-                "reply_audio_url": None,
-                "structured": {},
-            }
-
-        # all slots present → move to confirm
-        p = sess["slots"]
-        mode = p.get("mode", "agent")
-        amount = price_for(mode, p.get("genre", "other"))
-        sess["pending_proposal"] = {
-            "name": p["name"],
-            "country_code": p["country_code"],
-            "phone": p["phone"],
-            "date": p["date"],
-            "time": p["time"],
-            "genre": p["genre"],
-            "mode": mode,
-            "final_amount": amount,
-        }
-        sess["stage"] = "confirm"
 
+def _do_start_booking(turn: Turn) -> Reply:
+    mode = _booking_mode(turn)
+    turn.sess["stage"] = "collect"
+    turn.slots["mode"] = mode
+
+    cc = turn.slots.get("country_code", "")
+    ph = turn.slots.get("phone", "")
+    if ph:
+        disp = f"{cc}{ph}" if cc else ph
         core = (
-            "Just confirming — you’d like a "
-            f"{'AI agent' if mode == 'agent' else 'call'} with these details:\n"
-            f"- Name: {p['name']}\n"
-            f"- Phone: {p['country_code']}{p['phone']}\n"
-            f"- Date & time: {p['date']} at {p['time']}\n"
-            f"- Category: {p['genre']}\n"
-            f"- Estimated total: {CURRENCY}{amount}\n"
-            "Reply 'confirm' to finalize, or 'change' if you want to edit anything."
+            f"Great — let’s book your {mode}. I see your phone as {disp}. "
+            "You can use this or send a different number.\n" + BOOKING_ASK
         )
-        reply = smart_rewrite(core, user_text)
-        return {
-            "reply_text": reply,
-            "transcript": None,
-            "reply_audio_url": None,
-            "structured": {},
-        }
+    else:
+        core = f"Great — let’s book your {mode}. " + BOOKING_ASK
+    return core, {}
 
-    # --------------------------------------------------------
-    # STAGE: confirm → confirm or change
-    # --------------------------------------------------------
-    if sess["stage"] == "confirm":
-        if "change" in low:
-            sess["stage"] = "collect"
-            core = "No problem — tell me what you’d like to change (name, phone, date, time, or agent category)."
-            reply = smart_rewrite(core, user_text)
-            return {
-                "reply_text": reply,
-                "transcript": None,
-                "reply_audio_url": None,
-                "structured": {},
-            }
-
-        if any(w in low for w in ["confirm", "yes, book", "yes please", "yes", "book it"]):
-            p = sess.get("pending_proposal") or {}
-            mode = p.get("mode", "agent")
-            amount = p.get("final_amount", price_for(mode, p.get("genre", "other")))
-            cc = p.get("country_code", "")
-            ph = p.get("phone", "")
-            full_phone = ph if ph.startswith("+") else f"{cc}{ph}" if ph else ""
-
-            saved = save_booking(
-                session=sid,
-                phone=full_phone,
-                name=p.get("name", ""),
-                booking_type=mode,
-                agent_type=p.get("genre", ""),
-                base_amount=0.0,
-                addons=[],
-                custom_features=[],
-                date=p.get("date"),
-                time=p.get("time"),
-                payment_status="pending",
-                final_amount=amount,
-            )
-            if not saved.get("ok"):
-                core = "I couldn’t save your booking just now. Please try again in a moment."
-                reply = smart_rewrite(core, user_text)
-                return {
-                    "reply_text": reply,
-                    "transcript": None,
-                    "reply_audio_url": None,
-                    "structured": {},
-                }
-
-            bid = saved.get("booking_id")
-            sess["last_booking_id"] = bid
-
-            # notify owner
-            try:
-                notify_owner(
-                    f"New booking {bid}: {mode} ({p.get('genre')}) on {p.get('date')} at {p.get('time')} for {p.get('name')}."
-                )
-            except Exception:
-                pass
-
-            # WhatsApp confirmation to user
-            if full_phone:
-                try:
-                    send_whatsapp_text(
-                        to=full_phone,
-                        body=(
-                            f"Hello {p.get('name')}, your booking is confirmed.\n"
-                            f"Booking ID: {bid}\n"
-                            f"Date: {p.get('date')} at {p.get('time')}\n"
-                            f"Type: {mode} ({p.get('genre')})\n"
-                            f"Amount: {CURRENCY}{amount} (payment pending)."
-                        ),
-                    )
-                except Exception:
-                    pass
-
-            sess["stage"] = "payment"
-
-            core = (
-                f"Booking confirmed. Your Booking ID is {bid} and the total is {CURRENCY}{amount}. "
-                "Would you like to pay now using a UPI QR code, or pay offline at the time of service?"
-            )
-            reply = smart_rewrite(core, user_text)
-            return {
-                "reply_text": reply,
-                "transcript": None,
-                "reply_audio_url": None,
-                "structured": {"booking_id": bid},
-            }
-
-        # unclear
-        core = "To continue, reply 'confirm' to finalize your booking, or 'change' to adjust any detail."
-        reply = smart_rewrite(core, user_text)
-        return {
-            "reply_text": reply,
-            "transcript": None,
-            "reply_audio_url": None,
-            "structured": {},
-        }
 
-    # --------------------------------------------------------
-    # STAGE: payment → choose UPI or offline
-    # --------------------------------------------------------
-    if sess["stage"] == "payment":
-        bid = sess.get("last_booking_id")
-        if not bid:
-            sess["stage"] = "idle"
-            core = "I don’t see a booking in progress. You can say 'book an AI agent' or 'book a call' to start."
-            reply = smart_rewrite(core, user_text)
-            return {
-                "reply_text": reply,
-                "transcript": None,
-                "reply_audio_url": None,
-                "structured": {},
-            }
-
-        want_upi = any(k in low for k in ["upi", "qr", "online", "pay now"])
-        want_offline = any(k in low for k in ["offline", "cash", "later"])
-
-        bk = get_booking_by_id(bid)
-        booking = bk["booking"] if bk.get("ok") else {}
-        amount = booking.get("final_amount", price_for(booking.get("type", "agent"), booking.get("agent_type", "other")))
-        cc = sess["slots"].get("country_code", "") or ""
-        ph = sess["slots"].get("phone", "") or ""
-        full_phone = ph if ph.startswith("+") else f"{cc}{ph}" if ph else ""
-
-        if want_upi:
-            qr = generate_upi_qr(booking_id=str(bid), amount=amount, phone=full_phone)
-            if not qr.get("ok"):
-                core = "I couldn’t generate the payment QR right now. Please try again later."
-                reply = smart_rewrite(core, user_text)
-                return {
-                    "reply_text": reply,
-                    "transcript": None,
-                    "reply_audio_url": None,
-                    "structured": {},
-                }
-
-            url = qr.get("qr_url") or qr.get("public_url")
-
-            if full_phone:
-                try:
-                    send_whatsapp_text(
-                        to=full_phone,
-                        body=f"Your payment QR for Booking ID {bid} is ready in the web app. Amount: {CURRENCY}{amount}.",
-                    )
-                except Exception:
-                    pass
-
-            core = f"Here’s your UPI QR for Booking ID {bid}. You can scan it to pay {CURRENCY}{amount} now."
-            reply = smart_rewrite(core, user_text)
-            sess["stage"] = "done"
-            return {
-                "reply_text": reply,
-                "transcript": None,
-                "reply_audio_url": None,
-                "structured": {"qr_url": url} if url else {},
-            }
-
-        if want_offline:
-            core = (
-                f"Got it — you can pay {CURRENCY}{amount} offline at the time of service. "
-                "If you want a UPI QR later, just say 'send payment QR for my booking'."
-            )
-            reply = smart_rewrite(core, user_text)
-            sess["stage"] = "done"
-            return {
-                "reply_text": reply,
-                "transcript": None,
-                "reply_audio_url": None,
-                "structured": {},
-            }
-
-        # unclear in payment stage → hint
+def _do_idle_menu(turn: Turn) -> Reply:
+    return IDLE_MENU_REPLY, {}
+
+
+# ---- collect ----
+
+def _prepare_collect(turn: Turn) -> None:
+    """Slot extraction + date/time validation; runs only when a collect-stage guard will be evaluated."""
+    slots = turn.slots
+    with span("slots:extract"):
+        turn.data["filled_now"] = extract_all_slots(turn.user_text, slots)
+
+    # validate date+time as soon as both are present
+    if slots.get("date") and slots.get("time"):
+        with span("datetime:validate"):
+            v = validate_datetime(f"{slots['date']} {slots['time']}")
+        if not v.get("ok", True):
+            slots.pop("date", None)
+            slots.pop("time", None)
+            turn.data["bad_datetime"] = v
+    turn.data["miss"] = missing_slots(slots)
+
+
+def _do_bad_datetime(turn: Turn) -> Reply:
+    v = turn.data["bad_datetime"]
+    return v.get("summary", "The date and time don’t look valid. Please send a future date and time."), {}
+
+
+def _do_saved_some(turn: Turn) -> Reply:
+    nice_filled = ", ".join(slot_human_name(s) for s in turn.data["filled_now"])
+    return f"Got it — I’ve saved your {nice_filled}. I still need: {_still_need(turn.data['miss'])}. Send whichever is easiest next.", {}
+
+
+def _do_ask_missing(turn: Turn) -> Reply:
+    # classification for non-slot questions mid-flow
+    nice_miss = _still_need(turn.data["miss"])
+    if turn.qtype == "external":
         core = (
-            "Would you like to pay now using a UPI QR code, or pay offline at the time of service? "
-            "You can say 'UPI' or 'offline'."
+            "I don’t have access to general external information like presidents or world facts. "
+            f"For your booking, I still need: {nice_miss}."
         )
-        reply = smart_rewrite(core, user_text)
-        return {
-            "reply_text": reply,
-            "transcript": None,
-            "reply_audio_url": None,
-            "structured": {},
-        }
+    elif turn.qtype == "personality":
+        core = (
+            "I’m an AI agent without human-style feelings or opinions. "
+            f"For your booking, I still need: {nice_miss}."
+        )
+    elif turn.qtype == "random":
+        core = (
+            "I’m mainly focused on helping with your booking, pricing, and our AI agents. "
+            f"Right now I still need: {nice_miss}."
+        )
+    else:
+        core = (
+            f"I’m not sure which detail that was. For your booking, I still need: {nice_miss}. "
+            "You can send any one of these."
+        )
+    return core, {}
+
+
+def _do_propose(turn: Turn) -> Reply:
+    # all slots present → move to confirm
+    p = turn.slots
+    mode = p.get("mode", "agent")
+    amount = price_for(mode, p.get("genre", "other"))
+    turn.sess["pending_proposal"] = {
+        "name": p["name"],
+        "country_code": p["country_code"],
+        "phone": p["phone"],
+        "date": p["date"],
+        "time": p["time"],
+        "genre": p["genre"],
+        "mode": mode,
+        "final_amount": amount,
+    }
+    turn.sess["stage"] = "confirm"
+    return (
+        "Just confirming — you’d like a "
+        f"{'AI agent' if mode == 'agent' else 'call'} with these details:\n"
+        f"- Name: {p['name']}\n"
+        f"- Phone: {p['country_code']}{p['phone']}\n"
+        f"- Date & time: {p['date']} at {p['time']}\n"
+        f"- Category: {p['genre']}\n"
+        f"- Estimated total: {CURRENCY}{amount}\n"
+        "Reply 'confirm' to finalize, or 'change' if you want to edit anything."
+    ), {}
+
+
+# ---- confirm ----
+
+def _do_change(turn: Turn) -> Reply:
+    turn.sess["stage"] = "collect"
+    return CHANGE_REPLY, {}
+
+
+def _do_book(turn: Turn) -> Reply:
+    p = turn.sess.get("pending_proposal") or {}
+    mode = p.get("mode", "agent")
+    amount = p.get("final_amount", price_for(mode, p.get("genre", "other")))
+    cc = p.get("country_code", "")
+    ph = p.get("phone", "")
+    full_phone = ph if ph.startswith("+") else f"{cc}{ph}" if ph else ""
+
+    saved = save_booking(
+        session=turn.sid,
+        phone=full_phone,
+        name=p.get("name", ""),
+        booking_type=mode,
+        agent_type=p.get("genre", ""),
+        base_amount=0.0,
+        addons=[],
+        custom_features=[],
+        date=p.get("date"),
+        time=p.get("time"),
+        payment_status="pending",
+        final_amount=amount,
+    )
+    if not saved.get("ok"):
+        return "I couldn’t save your booking just now. Please try again in a moment.", {}
 
-    # --------------------------------------------------------
-    # STAGE: done / fallback
-    # --------------------------------------------------------
-    core = (
-        f"I can help you with new bookings, pricing, location, or payments. "
-        "You can say 'book an AI agent', 'book a call', 'show price catalog', or 'send office location'."
+    bid = saved.get("booking_id")
+    turn.sess["last_booking_id"] = bid
+
+    # notify owner (background delivery, deduped per booking)
+    enqueue_message(
+        "owner",
+        body=f"New booking {bid}: {mode} ({p.get('genre')}) on {p.get('date')} at {p.get('time')} for {p.get('name')}.",
+        idem_key=f"{bid}:owner",
     )
-    reply = smart_rewrite(core, user_text)
-    return {
-        "reply_text": reply,
-        "transcript": None,
-        "reply_audio_url": None,
-        "structured": {},
-    }
+
+    # WhatsApp confirmation to user
+    if full_phone:
+        enqueue_message(
+            "whatsapp",
+            to=full_phone,
+            body=(
+                f"Hello {p.get('name')}, your booking is confirmed.\n"
+                f"Booking ID: {bid}\n"
+                f"Date: {p.get('date')} at {p.get('time')}\n"
+                f"Type: {mode} ({p.get('genre')})\n"
+                f"Amount: {CURRENCY}{amount} (payment pending)."
+            ),
+            idem_key=f"{bid}:confirm",
+        )
+
+    turn.sess["stage"] = "payment"
+    return (
+        f"Booking confirmed. Your Booking ID is {bid} and the total is {CURRENCY}{amount}. "
+        "Would you like to pay now using a UPI QR code, or pay offline at the time of service?"
+    ), {"booking_id": bid}
+
+
+def _do_confirm_hint(turn: Turn) -> Reply:
+    return CONFIRM_HINT_REPLY, {}
+
+
+# ---- payment ----
+
+def _prepare_payment(turn: Turn) -> None:
+    """Booking lookup for the payment choices; skipped when there is nothing to pay for."""
+    bid = turn.sess.get("last_booking_id")
+    if not bid or not ("upi_kw" in turn.hits or "offline_kw" in turn.hits):
+        return
+    bk = get_booking_by_id(bid)
+    turn.data["amount"] = _booking_amount(bk["booking"] if bk.get("ok") else {})
+    turn.data["full_phone"] = _session_phone(turn.slots)
+
+
+def _do_no_booking(turn: Turn) -> Reply:
+    turn.sess["stage"] = "idle"
+    return NO_BOOKING_REPLY, {}
+
+
+def _do_pay_upi(turn: Turn) -> Reply:
+    bid, amount = turn.sess["last_booking_id"], turn.data["amount"]
+    structured = _send_qr(bid, amount, turn.data["full_phone"])
+    if structured is None:
+        return QR_FAILED, {}
+    turn.sess["stage"] = "done"
+    return f"Here’s your UPI QR for Booking ID {bid}. You can scan it to pay {CURRENCY}{amount} now.", structured
+
+
+def _do_pay_offline(turn: Turn) -> Reply:
+    turn.sess["stage"] = "done"
+    return (
+        f"Got it — you can pay {CURRENCY}{turn.data['amount']} offline at the time of service. "
+        "If you want a UPI QR later, just say 'send payment QR for my booking'."
+    ), {}
+
+
+def _do_payment_hint(turn: Turn) -> Reply:
+    return PAYMENT_HINT_REPLY, {}
+
+
+# ---- done / fallback ----
+
+def _do_fallback(turn: Turn) -> Reply:
+    return FALLBACK_REPLY, {}
+
+
+DIALOGUE = DialogueMachine(
+    transitions=[
+        # global: checked first, in this order, at every stage
+        Transition("global.company", lambda t: t.qtype == "company", _do_company),
+        Transition("global.catalog", lambda t: t.intent == "get_catalog" or "catalog_kw" in t.hits, _do_catalog),
+        Transition("global.location", lambda t: t.intent == "get_location" or "location_kw" in t.hits, _do_location),
+        Transition("global.small_talk", lambda t: t.intent == "small_talk", _do_small_talk),
+        Transition("global.pay", lambda t: t.intent == "pay" or "pay_kw" in t.hits, _do_pay),
+
+        Transition("idle.start_booking", lambda t: _booking_mode(t) is not None, _do_start_booking, stages=["idle"]),
+        Transition("idle.menu", always, _do_idle_menu, stages=["idle"]),
+
+        Transition("collect.bad_datetime", lambda t: "bad_datetime" in t.data, _do_bad_datetime, stages=["collect"]),
+        Transition("collect.saved_some", lambda t: bool(t.data["miss"] and t.data["filled_now"]), _do_saved_some, stages=["collect"]),
+        Transition("collect.ask_missing", lambda t: bool(t.data["miss"]), _do_ask_missing, stages=["collect"]),
+        Transition("collect.propose", always, _do_propose, stages=["collect"]),
+
+        Transition("confirm.change", lambda t: "change_kw" in t.hits, _do_change, stages=["confirm"]),
+        Transition("confirm.book", lambda t: "confirm_kw" in t.hits, _do_book, stages=["confirm"]),
+        Transition("confirm.hint", always, _do_confirm_hint, stages=["confirm"]),
+
+        Transition("payment.no_booking", lambda t: not t.sess.get("last_booking_id"), _do_no_booking, stages=["payment"]),
+        Transition("payment.upi", lambda t: "upi_kw" in t.hits, _do_pay_upi, stages=["payment"]),
+        Transition("payment.offline", lambda t: "offline_kw" in t.hits, _do_pay_offline, stages=["payment"]),
+        Transition("payment.hint", always, _do_payment_hint, stages=["payment"]),
+    ],
+    fallback=Transition("fallback", always, _do_fallback),
+    prepare={"collect": _prepare_collect, "payment": _prepare_payment},
+)
+
+
+def dialogue_stats() -> Dict[str, Any]:
+    return DIALOGUE.stats()
@@ -0,0 +1,18 @@
+# tests/conftest.py — run the suite from the repo root without installing anything
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# keep test runs off the network and out of the real data files
+os.environ.setdefault("MESSAGING_TRANSPORT", "fake")
+os.environ.setdefault("REWRITE_POLICY", "never")
+os.environ.setdefault("STT_ENGINE", "none")
+os.environ.setdefault("TTS_ENGINE", "none")
+os.environ.setdefault("STT_WORKERS", "0")
+os.environ.setdefault("WARM_UP_BACKGROUND", "0")
+os.environ.setdefault("SESSION_STORE", "memory")
+os.environ.setdefault("OUTBOX_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="outbox-"), "outbox.db"))
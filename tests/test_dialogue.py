@@ -0,0 +1,177 @@
+import itertools
+
+import pytest
+
+import orchestration as orch
+import tools.save_Booking as save_booking_mod
+import tools.send_location as send_location
+
+# replies as the old run_agent if-chain produced them (REWRITE_POLICY=never)
+STILL_NEED_ALL_BUT_NAME = (
+    "your country calling code (like +91 or +1), your phone number, the date, the time, "
+    "the agent category (gym / salon / restaurant / other)"
+)
+_sids = itertools.count()
+
+
+@pytest.fixture(autouse=True)
+def bookings_db(tmp_path, monkeypatch):
+    save_booking_mod.close_thread_connection()
+    monkeypatch.setattr(save_booking_mod, "DB_PATH", str(tmp_path / "bookings.db"))
+    monkeypatch.setattr(save_booking_mod, "_schema_ready", False)
+    yield
+    save_booking_mod.close_thread_connection()
+
+
+@pytest.fixture
+def sid():
+    return f"test-dialogue-{next(_sids)}"
+
+
+def say(sid, text):
+    res = orch.run_agent([{"role": "user", "parts": [{"text": text}]}], sid, rewrite=False)
+    sess = orch.SESSIONS.get(sid)
+    return res, sess["stage"], sess["last_transition"]
+
+
+def start_agent_booking(sid):
+    say(sid, "I want to book an AI agent")
+    say(sid, "My name is Ravi Kumar")
+    say(sid, "+91 9876543210")
+    say(sid, "25 Dec at 7 pm")
+
+
+def test_greeting_and_idle_menu(sid):
+    res, stage, fired = say(sid, "hi")
+    assert res["reply_text"] == "Hey — I’m the AI assistant for Aarush AI Solutions. How can I help?"
+    assert (stage, fired) == ("idle", "global.small_talk")
+
+    res, stage, fired = say(sid, "what can you do")
+    assert res["reply_text"] == orch.IDLE_MENU_REPLY
+    assert (stage, fired) == ("idle", "idle.menu")
+
+
+def test_start_booking_and_collect_slots(sid):
+    res, stage, fired = say(sid, "I want to book an AI agent")
+    assert res["reply_text"] == f"Great — let’s book your agent. {orch.BOOKING_ASK}"
+    assert (stage, fired) == ("collect", "idle.start_booking")
+
+    res, stage, fired = say(sid, "My name is Ravi Kumar")
+    assert res["reply_text"] == (
+        f"Got it — I’ve saved your your full name. I still need: {STILL_NEED_ALL_BUT_NAME}. "
+        "Send whichever is easiest next."
+    )
+    assert (stage, fired) == ("collect", "collect.saved_some")
+
+    res, stage, fired = say(sid, "hmm")
+    assert res["reply_text"] == (
+        f"I’m not sure which detail that was. For your booking, I still need: {STILL_NEED_ALL_BUT_NAME}. "
+        "You can send any one of these."
+    )
+    assert (stage, fired) == ("collect", "collect.ask_missing")
+
+    res, stage, fired = say(sid, "who is the president?")
+    assert res["reply_text"] == (
+        "I don’t have access to general external information like presidents or world facts. "
+        f"For your booking, I still need: {STILL_NEED_ALL_BUT_NAME}."
+    )
+    assert (stage, fired) == ("collect", "collect.ask_missing")
+
+
+def test_invalid_datetime_is_dropped(sid):
+    say(sid, "I want to book an AI agent")
+    say(sid, "My name is Ravi Kumar")
+    res, stage, fired = say(sid, "31 Feb at 7 pm")
+    assert res["reply_text"] == "The date and time don’t look valid. Please send a future date and time."
+    assert (stage, fired) == ("collect", "collect.bad_datetime")
+    slots = orch.SESSIONS.get(sid)["slots"]
+    assert "date" not in slots and "time" not in slots
+
+
+def test_confirm_books_and_offline_payment(sid):
+    start_agent_booking(sid)
+    res, stage, fired = say(sid, "gym")
+    assert res["reply_text"].startswith("Just confirming — you’d like a AI agent with these details:\n- Name: Ravi Kumar\n")
+    assert "- Date & time: 25 Dec at 7 pm\n- Category: gym\n- Estimated total: ₹15000\n" in res["reply_text"]
+    assert (stage, fired) == ("confirm", "collect.propose")
+
+    res, stage, fired = say(sid, "not sure")
+    assert res["reply_text"] == orch.CONFIRM_HINT_REPLY
+    assert (stage, fired) == ("confirm", "confirm.hint")
+
+    res, stage, fired = say(sid, "yes, book it")
+    bid = res["structured"]["booking_id"]
+    assert res["reply_text"] == (
+        f"Booking confirmed. Your Booking ID is {bid} and the total is ₹15000. "
+        "Would you like to pay now using a UPI QR code, or pay offline at the time of service?"
+    )
+    assert (stage, fired) == ("payment", "confirm.book")
+    assert save_booking_mod.get_booking_by_id(bid)["ok"]
+
+    res, stage, fired = say(sid, "maybe")
+    assert res["reply_text"] == orch.PAYMENT_HINT_REPLY
+    assert (stage, fired) == ("payment", "payment.hint")
+
+    res, stage, fired = say(sid, "offline")
+    assert res["reply_text"].startswith("Got it — you can pay ₹15000")
+    assert (stage, fired) == ("done", "payment.offline")
+
+    res, stage, fired = say(sid, "thanks")
+    assert res["reply_text"] == orch.FALLBACK_REPLY
+    assert (stage, fired) == ("done", "fallback")
+
+
+def test_change_goes_back_to_collect(sid):
+    start_agent_booking(sid)
+    say(sid, "gym")
+    res, stage, fired = say(sid, "change")
+    assert res["reply_text"] == orch.CHANGE_REPLY
+    assert (stage, fired) == ("collect", "confirm.change")
+
+    # every slot is still filled, so the next message re-proposes
+    res, stage, fired = say(sid, "salon")
+    assert res["reply_text"].startswith("Just confirming")
+    assert (stage, fired) == ("confirm", "collect.propose")
+
+
+@pytest.mark.parametrize("stage_setup, expected_stage, expected_fired, expected_reply", [
+    # the old chain had no cancel branch: each stage answers with its default
+    ("idle", "idle", "idle.menu", orch.IDLE_MENU_REPLY),
+    ("confirm", "confirm", "confirm.hint", orch.CONFIRM_HINT_REPLY),
+    ("payment", "payment", "payment.hint", orch.PAYMENT_HINT_REPLY),
+])
+def test_cancel_matches_old_chain(sid, stage_setup, expected_stage, expected_fired, expected_reply):
+    if stage_setup != "idle":
+        start_agent_booking(sid)
+        say(sid, "gym")
+    if stage_setup == "payment":
+        say(sid, "confirm")
+    res, stage, fired = say(sid, "cancel my booking")
+    assert res["reply_text"] == expected_reply
+    assert (stage, fired) == (expected_stage, expected_fired)
+
+
+def test_faq_answers_at_any_stage(sid):
+    res, stage, fired = say(sid, "what does aarush ai do?")
+    assert res["reply_text"] == orch.COMPANY_REPLY
+    assert (stage, fired) == ("idle", "global.company")
+
+    say(sid, "I want to book an AI agent")
+    say(sid, "My name is Ravi Kumar")
+    res, stage, fired = say(sid, "what does aarush ai do?")
+    assert res["reply_text"] == f"{orch.COMPANY_REPLY} For your current booking, I still need: {STILL_NEED_ALL_BUT_NAME}."
+    assert (stage, fired) == ("collect", "global.company")
+
+    res, stage, fired = say(sid, "what is the price?")
+    url = res["structured"]["catalog_url"]
+    assert res["reply_text"] == (
+        f"Here’s the pricing catalog for our AI agents: {url} For your booking, I still need: {STILL_NEED_ALL_BUT_NAME}."
+    )
+    assert (stage, fired) == ("collect", "global.catalog")
+
+    res, stage, fired = say(sid, "send me your address")
+    assert res["reply_text"] == (
+        f"Location: {send_location.ADDRESS}. You can open it here: {send_location.MAP_LINK} "
+        f"For your booking, I still need: {STILL_NEED_ALL_BUT_NAME}."
+    )
+    assert (stage, fired) == ("collect", "global.location")
@@ -0,0 +1,94 @@
+import pytest
+
+from tools.detect_intent_tool import detect_intent_rules
+from tools.intent_matcher import PhraseMatcher, scan_text
+
+# the substring loop detect_intent_rules replaced, kept here as the reference
+_OLD_SIMPLE = {
+    "book_agent": ["book agent", "ai agent", "agent for", "book an agent", "i want an agent", "a ai agent"],
+    "book_call": ["book a call", "book call", "phone call", "schedule call", "call me"],
+    "cancel": ["cancel booking", "cancel my booking", "i want to cancel"],
+    "get_catalog": ["catalog", "price", "pricing", "show price", "send catalog"],
+    "get_location": ["location", "address", "where are you", "map"],
+    "pay": ["pay", "qr code", "upi", "pay now"],
+}
+
+
+def old_intent(text):
+    t = text.lower()
+    for intent, phrases in _OLD_SIMPLE.items():
+        for p in phrases:
+            if p in t:
+                return intent
+    if any(x in t for x in ("hi", "hello", "hey", "who are you", "how are you", "wait", "hold on")):
+        return "small_talk"
+    return "unknown"
+
+
+@pytest.mark.parametrize("text", [
+    "this is nice",
+    "which one",
+    "they said so",
+    "exchange rate",
+    "I want a happy ending",
+    "shipping address later",
+])
+def test_no_match_inside_words(text):
+    hits = scan_text(text)
+    assert "greet_kw" not in hits
+    assert "change_kw" not in hits
+    assert "small_talk" not in hits
+
+
+def test_this_and_exchange_do_not_trigger():
+    assert detect_intent_rules("this")["intent"] == "unknown"
+    assert "change_kw" not in scan_text("exchange")
+    assert "change_kw" in scan_text("I want to change the time")
+
+
+def test_multi_word_phrase_ignores_case_and_spacing():
+    hits = scan_text("Please BOOK   a\tcall for tomorrow")
+    assert "book_call" in hits
+    # the shorter phrase inside the longer match is reported too
+    assert "call_kw" in hits
+    start, end = hits["book_call"][0]
+    assert "Please BOOK   a\tcall for tomorrow"[start:end].lower().split() == ["book", "a", "call"]
+
+
+def test_longest_phrase_wins_the_span():
+    m = PhraseMatcher({"short": ["pay"], "long": ["pay now"]})
+    hits = m.scan("i will pay now")
+    assert hits["long"] == [(7, 14)]
+    assert hits["short"] == [(7, 14)]
+
+
+def test_every_occurrence_is_reported():
+    assert len(scan_text("hi, hi again")["greet_kw"]) == 2
+
+
+def test_intent_precedence_follows_priority_order():
+    # book_agent is listed before get_catalog and pay
+    res = detect_intent_rules("what is the price of an ai agent, can I pay by upi")
+    assert res["intent"] == "book_agent"
+    assert [m["intent"] for m in res["matches"]] == ["book_agent", "get_catalog", "pay"]
+    assert detect_intent_rules("send the catalog and a qr code")["intent"] == "get_catalog"
+
+
+@pytest.mark.parametrize("text", [
+    "I want to book an AI agent for my gym",
+    "can you book a call",
+    "please call me tomorrow",
+    "i want to cancel",
+    "show price",
+    "send catalog please",
+    "where are you located",
+    "what is your address",
+    "pay now",
+    "qr code please",
+    "hello there",
+    "how are you",
+    "hold on",
+    "random words only",
+])
+def test_matches_old_substring_loop_on_whole_words(text):
+    assert detect_intent_rules(text)["intent"] == old_intent(text)
@@ -0,0 +1,103 @@
+import pytest
+
+from tools import ttl_cache
+from tools.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = FakeClock()
+    monkeypatch.setattr(ttl_cache, "time", c)
+    return c
+
+
+def test_evicts_least_recently_used(clock):
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # a is now most recent
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    assert c.get("c") == 3
+    assert c.stats()["evictions"] == 1
+
+
+def test_set_existing_key_refreshes_recency(clock):
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.set("a", 10)
+    c.set("c", 3)
+    assert c.get("a") == 10
+    assert c.get("b") is None
+
+
+def test_entries_expire_after_ttl(clock):
+    c = TTLCache(maxsize=10, ttl=5)
+    c.set("a", 1)
+    clock.now += 4.9
+    assert c.get("a") == 1
+    clock.now += 0.2
+    assert c.get("a", "gone") == "gone"
+    assert len(c) == 0
+    assert c.stats()["expirations"] == 1
+
+
+def test_set_restarts_ttl(clock):
+    c = TTLCache(maxsize=10, ttl=5)
+    c.set("a", 1)
+    clock.now += 4
+    c.set("a", 2)
+    clock.now += 4
+    assert c.get("a") == 2
+
+
+def test_purge_and_periodic_sweep_drop_unread_expired_entries(clock):
+    c = TTLCache(maxsize=100, ttl=5, sweep_every=4)
+    c.set("a", 1)
+    c.set("b", 2)
+    clock.now += 10
+    assert c.purge_expired() == 2
+    c.set("x", 1)
+    clock.now += 10
+    c.set("y", 2)  # 4th write → sweep drops x, which nobody read
+    c.set("z", 3)
+    c.set("w", 4)
+    assert len(c) == 3
+    assert c.stats()["expirations"] == 3
+
+
+def test_stats_counters(clock):
+    c = TTLCache(maxsize=1, ttl=5)
+    c.get("missing")
+    c.set("a", 1)
+    c.get("a")
+    c.get("a")
+    c.set("b", 2)  # evicts a
+    clock.now += 6
+    c.get("b")  # expired
+    st = c.stats()
+    assert st == {
+        "size": 0, "maxsize": 1, "ttl_s": 5.0,
+        "hits": 2, "misses": 2, "hit_rate": 0.5,
+        "evictions": 1, "expirations": 1,
+    }
+
+
+def test_pop_and_clear(clock):
+    c = TTLCache(maxsize=10, ttl=5)
+    c.set("a", 1)
+    assert c.pop("a") == 1
+    assert c.pop("a", "none") == "none"
+    c.set("b", 2)
+    c.clear()
+    assert len(c) == 0
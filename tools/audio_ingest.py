@@ -0,0 +1,133 @@
+# tools/audio_ingest.py — keep voice uploads in memory, spill only large ones to a file
+import io
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from .startup import load_config
+
+load_config()
+
+# Hard cap on a voice request body; Flask enforces it while reading (413).
+AUDIO_MAX_BYTES = int(os.getenv("VOICE_MAX_BYTES", str(10 * 1024 * 1024)))
+# Uploads up to this size never touch the disk.
+AUDIO_SPOOL_MAX = int(os.getenv("VOICE_SPOOL_MAX_BYTES", str(2 * 1024 * 1024)))
+# Where larger uploads spill to (default: the system temp dir).
+AUDIO_SPOOL_DIR = os.getenv("VOICE_SPOOL_DIR") or None
+
+_LOCK = threading.Lock()
+_STATS = {"in_memory": 0, "spilled": 0, "bytes": 0, "too_large": 0, "too_long": 0}
+
+
+class AudioSpool:
+    """
+    Upload buffer: a BytesIO up to `max_size`, then a named temp file in
+    VOICE_SPOOL_DIR. Spilled uploads reach the STT workers as a path, so large
+    audio is never read back into memory; close() deletes the file.
+    """
+
+    def __init__(self, max_size: int = AUDIO_SPOOL_MAX):
+        self.max_size = max_size
+        self.path: Optional[str] = None
+        self._file: Any = io.BytesIO()
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path is None
+
+    def write(self, data) -> int:
+        if self.in_memory and self._file.tell() + len(data) > self.max_size:
+            self._spill()
+        return self._file.write(data)
+
+    def _spill(self) -> None:
+        fd, path = tempfile.mkstemp(prefix="voice-", suffix=".upload", dir=AUDIO_SPOOL_DIR)
+        f = os.fdopen(fd, "w+b")
+        f.write(self._file.getvalue())
+        self._file.close()
+        self.path, self._file = path, f
+
+    def getbuffer(self) -> memoryview:
+        return self._file.getbuffer()
+
+    def size(self) -> int:
+        pos = self._file.tell()
+        end = self._file.seek(0, os.SEEK_END)
+        self._file.seek(pos)
+        return end
+
+    def close(self) -> None:
+        self._file.close()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def __getattr__(self, name):
+        # read / seek / tell / flush ... go to the current buffer
+        return getattr(self._file, name)
+
+
+def spooled_stream_factory(total_content_length, content_type, filename=None, content_length=None):
+    """Werkzeug upload stream: an AudioSpool."""
+    return AudioSpool()
+
+
+@contextmanager
+def open_upload(storage):
+    """
+    Yields the uploaded audio without copying it:
+      - memoryview over the in-memory buffer (fed to ffmpeg's stdin), or
+      - the spilled file's path (ffmpeg / the STT worker opens it directly).
+    Other stream types (plain files) are yielded rewound.
+    """
+    stream = storage.stream
+    if isinstance(stream, AudioSpool):
+        size, in_memory = stream.size(), stream.in_memory
+        stream.flush()
+        payload = stream.getbuffer() if in_memory else stream.path
+    else:
+        stream.seek(0, os.SEEK_END)
+        size, in_memory = stream.tell(), False
+        stream.seek(0)
+        payload = stream
+    with _LOCK:
+        _STATS["in_memory" if in_memory else "spilled"] += 1
+        _STATS["bytes"] += size
+
+    try:
+        yield payload
+    finally:
+        # a live memoryview would stop the BytesIO from being closed
+        if isinstance(payload, memoryview):
+            payload.release()
+
+
+def audio_bytes(source: Any) -> Any:
+    """Picklable form of an upload for the STT worker processes (paths pass through)."""
+    if isinstance(source, (str, bytes)):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    source.seek(0)
+    return source.read()
+
+
+def record_too_large() -> None:
+    with _LOCK:
+        _STATS["too_large"] += 1
+
+
+def record_too_long() -> None:
+    with _LOCK:
+        _STATS["too_long"] += 1
+
+
+def ingest_stats() -> Dict[str, Any]:
+    with _LOCK:
+        out = dict(_STATS)
+    out.update({"max_bytes": AUDIO_MAX_BYTES, "spool_max_bytes": AUDIO_SPOOL_MAX})
+    return out
@@ -1,32 +1,36 @@
 ﻿# detect_intent_tool.py — final (rules-first, caching)
-import re, time
+import os
 from typing import Dict,Any
-_CACHE = {}
-
-_SIMPLE = {
-    "book_agent": ["book agent","ai agent","agent for","book an agent","i want an agent","a ai agent"],
-    "book_call": ["book a call","book call","phone call","schedule call","call me"],
-    "cancel": ["cancel booking","cancel my booking","i want to cancel"],
-    "get_catalog": ["catalog","price","pricing","show price","send catalog"],
-    "get_location": ["location","address","where are you","map"],
-    "pay": ["pay","qr code","upi","pay now"]
-}
+from .intent_matcher import INTENT_PHRASES, scan_text
+from .ttl_cache import TTLCache
+_CACHE = TTLCache(
+    maxsize=int(os.getenv("INTENT_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("INTENT_CACHE_TTL", "30")),
+)
 
 def detect_intent_cached(text:str, allow_llm:bool=True)->Dict[str,Any]:
     key = text.strip().lower()
-    if key in _CACHE and time.time()-_CACHE[key]["ts"]<30:
-        return _CACHE[key]["val"]
+    val = _CACHE.get(key)
+    if val is not None:
+        return val
     val = detect_intent_rules(key)
-    _CACHE[key] = {"ts": time.time(), "val": val}
+    _CACHE.set(key, val)
     return val
 
+def intent_cache_stats()->Dict[str,Any]:
+    return _CACHE.stats()
+
 def detect_intent_rules(text:str)->Dict[str,Any]:
-    t = text.lower()
-    for intent, phrases in _SIMPLE.items():
-        for p in phrases:
-            if p in t:
-                return {"intent": intent if intent!="get_catalog" else "get_catalog", "confidence": 0.9, "slots":{}}
+    """
+    One pass of the shared phrase matcher.
+    "hits" maps every matched label (intents, small_talk, run_agent keyword
+    groups) to its spans; "matches" lists the matched intents in priority order.
+    """
+    hits = scan_text(text)
+    matches = [{"intent": i, "spans": hits[i]} for i in INTENT_PHRASES if i in hits]
+    if matches:
+        return {"intent": matches[0]["intent"], "confidence": 0.9, "slots":{}, "matches": matches, "hits": hits}
     # simple fallback small talk
-    if any(x in t for x in ("hi","hello","hey","who are you","how are you","wait","hold on")):
-        return {"intent":"small_talk","confidence":0.5,"slots":{}}
-    return {"intent":"unknown","confidence":0.0,"slots":{}}
+    if "small_talk" in hits:
+        return {"intent":"small_talk","confidence":0.5,"slots":{}, "matches": [], "hits": hits}
+    return {"intent":"unknown","confidence":0.0,"slots":{}, "matches": [], "hits": hits}
@@ -0,0 +1,126 @@
+# tools/dialogue_fsm.py — table-driven dialogue state machine with per-transition stats
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .tracing import span
+
+Reply = Tuple[str, Dict[str, Any]]  # (draft reply, structured payload)
+
+
+class Turn:
+    """
+    Everything guards and actions need for one user message, computed once:
+    the intent, keyword hits and question type come from a single scan.
+    Stage hooks put their per-turn results in `data`.
+    """
+
+    __slots__ = ("sess", "sid", "user_text", "intent", "hits", "qtype", "data")
+
+    def __init__(self, sess: Dict[str, Any], sid: str, user_text: str,
+                 intent: str, hits: Dict[str, Any], qtype: Optional[str]):
+        self.sess = sess
+        self.sid = sid
+        self.user_text = user_text
+        self.intent = intent
+        self.hits = hits
+        self.qtype = qtype
+        self.data: Dict[str, Any] = {}
+
+    @property
+    def stage(self) -> str:
+        return self.sess.get("stage", "idle")
+
+    @property
+    def slots(self) -> Dict[str, Any]:
+        return self.sess["slots"]
+
+
+class Transition:
+    """
+    name    → recorded when it fires (e.g. "collect.ask_missing")
+    guard   → Turn -> bool; evaluated in table order, first True wins
+    action  → Turn -> Reply; may move sess["stage"]
+    stages  → stages it applies to; None = global (checked before any stage)
+    """
+
+    __slots__ = ("name", "guard", "action", "stages")
+
+    def __init__(self, name: str, guard: Callable[[Turn], bool],
+                 action: Callable[[Turn], Reply], stages: Optional[Iterable[str]] = None):
+        self.name = name
+        self.guard = guard
+        self.action = action
+        self.stages = tuple(stages) if stages is not None else None
+
+
+def always(turn: Turn) -> bool:
+    return True
+
+
+class DialogueMachine:
+    """
+    Dispatch order per turn:
+      1. global transitions
+      2. the stage's prepare hook (e.g. slot extraction) — only if no global fired
+      3. the stage's transitions
+      4. fallback
+    Guards are indexed per stage up front, so a turn only evaluates the
+    transitions that can apply to its stage.
+    """
+
+    def __init__(self, transitions: List[Transition], fallback: Transition,
+                 prepare: Optional[Dict[str, Callable[[Turn], None]]] = None):
+        self.fallback = fallback
+        self.prepare = dict(prepare or {})
+        self._global = [t for t in transitions if t.stages is None]
+        self._by_stage: Dict[str, List[Transition]] = {}
+        for t in transitions:
+            for s in t.stages or ():
+                self._by_stage.setdefault(s, []).append(t)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _fire(self, t: Transition, turn: Turn, started: float) -> Tuple[str, Reply]:
+        with span(f"transition:{t.name}"):
+            reply = t.action(turn)
+        self._record(t.name, started)
+        return t.name, reply
+
+    def dispatch(self, turn: Turn) -> Tuple[str, Reply]:
+        """Returns (name of the transition that fired, its reply)."""
+        started = time.perf_counter()
+        for t in self._global:
+            if t.guard(turn):
+                return self._fire(t, turn, started)
+
+        stage = turn.stage
+        hook = self.prepare.get(stage)
+        if hook is not None:
+            with span(f"prepare:{stage}"):
+                hook(turn)
+        for t in self._by_stage.get(stage, ()):
+            if t.guard(turn):
+                return self._fire(t, turn, started)
+        return self._fire(self.fallback, turn, started)
+
+    def _record(self, name: str, started: float) -> None:
+        ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            st = self._stats.get(name)
+            if st is None:
+                st = self._stats[name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            st["count"] += 1
+            st["total_ms"] += ms
+            st["max_ms"] = max(st["max_ms"], ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = {}
+            for name, st in sorted(self._stats.items()):
+                out[name] = {
+                    "count": int(st["count"]),
+                    "avg_ms": round(st["total_ms"] / st["count"], 3),
+                    "max_ms": round(st["max_ms"], 3),
+                }
+        return {"transitions": out}
@@ -1,10 +1,18 @@
 ﻿# tools/generate_qr_code.py
+import hashlib
+import io
+import itertools
 import os
-from typing import Dict, Any
-import qrcode
-from dotenv import load_dotenv
+import threading
+import time
+from typing import Dict, Any, Optional
+from .startup import lazy_import, load_config
+from .ttl_cache import TTLCache
+from .tracing import traced
 
-load_dotenv()
+load_config()
+# PIL + qrcode are only needed once someone asks to pay
+qrcode = lazy_import("qrcode")
 
 # Example: PUBLIC_BASE_URL = "https://your-railway-app-url.up.railway.app"
 PUBLIC_BASE = os.getenv("PUBLIC_BASE_URL", "").rstrip("/")
@@ -14,6 +22,17 @@ QR_DIR = os.path.join(
 )
 os.makedirs(QR_DIR, exist_ok=True)
 
+# QR files are named by a hash of the UPI URI, so a file on disk is always
+# the right image for that payment and can be reused as-is.
+QR_MEMORY_CACHE = int(os.getenv("QR_MEMORY_CACHE", "128"))
+QR_DIR_MAX_FILES = int(os.getenv("QR_DIR_MAX_FILES", "500"))
+QR_DIR_MAX_AGE = float(os.getenv("QR_DIR_MAX_AGE", str(7 * 24 * 3600)))
+QR_CLEANUP_EVERY = int(os.getenv("QR_CLEANUP_EVERY", "50"))
+
+_PNG_CACHE = TTLCache(maxsize=QR_MEMORY_CACHE, ttl=QR_DIR_MAX_AGE)
+_calls = itertools.count(1)
+_cleanup_lock = threading.Lock()
+
 
 def _make_public_url(filename: str) -> str:
     if PUBLIC_BASE:
@@ -22,6 +41,61 @@ def _make_public_url(filename: str) -> str:
     return f"/media/qr/{filename}"
 
 
+def _qr_filename(upi_url: str) -> str:
+    return f"qr_{hashlib.sha256(upi_url.encode('utf-8')).hexdigest()[:20]}.png"
+
+
+def _render_png(upi_url: str) -> bytes:
+    buf = io.BytesIO()
+    qrcode.make(upi_url).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def get_qr_png(filename: str, read_disk: bool = True) -> Optional[bytes]:
+    """PNG bytes for a generated QR, from memory when possible (for the media route)."""
+    filename = os.path.basename(filename)
+    data = _PNG_CACHE.get(filename)
+    if data is not None or not read_disk:
+        return data
+    path = os.path.join(QR_DIR, os.path.basename(filename))
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    _PNG_CACHE.set(filename, data)
+    return data
+
+
+def cleanup_qr_dir(max_files: int = QR_DIR_MAX_FILES, max_age: float = QR_DIR_MAX_AGE) -> int:
+    """Delete QR files older than max_age, then the oldest beyond max_files. Returns count removed."""
+    if not _cleanup_lock.acquire(blocking=False):
+        return 0
+    try:
+        now = time.time()
+        entries = []
+        for e in os.scandir(QR_DIR):
+            if e.is_file() and e.name.startswith("qr_") and e.name.endswith(".png"):
+                entries.append((e.stat().st_mtime, e.path, e.name))
+        entries.sort()
+        doomed = [x for x in entries if now - x[0] > max_age]
+        keep = [x for x in entries if now - x[0] <= max_age]
+        if len(keep) > max_files:
+            doomed += keep[: len(keep) - max_files]
+        removed = 0
+        for _, path, name in doomed:
+            try:
+                os.remove(path)
+                _PNG_CACHE.pop(name)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+    finally:
+        _cleanup_lock.release()
+
+
+@traced("qr:generate")
 def generate_upi_qr(booking_id: str, amount: float, phone: str = "") -> Dict[str, Any]:
     """
     Generate static QR image and return public URL.
@@ -40,18 +114,31 @@ def generate_upi_qr(booking_id: str, amount: float, phone: str = "") -> Dict[str
             f"&tn=Booking%20{booking_id}"
         )
 
-        filename = f"qr_{booking_id}.png"
+        filename = _qr_filename(upi_url)
         path = os.path.join(QR_DIR, filename)
 
-        img = qrcode.make(upi_url)
-        img.save(path)
+        if os.path.exists(path):
+            # reuse; bump mtime so cleanup treats it as recently used
+            os.utime(path, None)
+            cached = True
+        else:
+            data = _render_png(upi_url)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            _PNG_CACHE.set(filename, data)
+            cached = False
+
+        if next(_calls) % QR_CLEANUP_EVERY == 0:
+            cleanup_qr_dir()
 
         public_url = _make_public_url(filename)
         return {
             "ok": True,
             "public_url": public_url,
             "qr_url": public_url,
-            "summary": "QR generated",
+            "summary": "QR reused" if cached else "QR generated",
         }
     except Exception as e:
         return {"ok": False, "summary": f"QR error: {str(e)}"}
@@ -0,0 +1,83 @@
+# tools/intent_matcher.py — one precompiled, word-bounded phrase matcher
+import re
+from typing import Dict, List, Tuple
+
+Span = Tuple[int, int]
+
+
+class PhraseMatcher:
+    """
+    Compiles every phrase of every label into a single regex
+    (longest phrase first, whole words only) and finds all labels in one scan.
+
+    A match also reports the labels of shorter phrases it contains
+    ("book a call" → book_call and call_kw), so consuming the longer
+    phrase never hides a keyword group.
+    """
+
+    def __init__(self, groups: Dict[str, List[str]]):
+        self._labels: Dict[str, List[str]] = {}
+        for label, phrases in groups.items():
+            for p in phrases:
+                p = p.lower().strip()
+                if p and label not in self._labels.setdefault(p, []):
+                    self._labels[p].append(label)
+
+        phrases = sorted(self._labels, key=len, reverse=True)
+        for p in phrases:
+            for q in phrases:
+                if q != p and len(q) < len(p) and re.search(rf"\b{re.escape(q)}\b", p):
+                    for label in self._labels[q]:
+                        if label not in self._labels[p]:
+                            self._labels[p].append(label)
+
+        alternation = "|".join(re.escape(p).replace(r"\ ", r"\s+") for p in phrases)
+        self._re = re.compile(rf"\b(?:{alternation})\b", re.I)
+
+    def scan(self, text: str) -> Dict[str, List[Span]]:
+        """Returns {label: [(start, end), ...]} for every label found in text."""
+        hits: Dict[str, List[Span]] = {}
+        if not text:
+            return hits
+        for m in self._re.finditer(text):
+            phrase = " ".join(m.group(0).lower().split())
+            for label in self._labels.get(phrase, ()):
+                hits.setdefault(label, []).append(m.span())
+        return hits
+
+
+# Intents in priority order: the first one found wins.
+INTENT_PHRASES: Dict[str, List[str]] = {
+    "book_agent": ["book agent", "ai agent", "agent for", "book an agent", "i want an agent", "a ai agent"],
+    "book_call": ["book a call", "book call", "phone call", "schedule call", "call me"],
+    "cancel": ["cancel booking", "cancel my booking", "i want to cancel"],
+    "get_catalog": ["catalog", "catalogue", "price", "prices", "pricing", "show price", "send catalog"],
+    "get_location": ["location", "address", "where are you", "map"],
+    "pay": ["pay", "qr code", "upi", "pay now", "payment"],
+}
+
+SMALL_TALK_PHRASES = ["hi", "hello", "hey", "who are you", "how are you", "wait", "hold on"]
+
+# Keyword groups orchestration.run_agent branches on.
+KEYWORD_GROUPS: Dict[str, List[str]] = {
+    "catalog_kw": ["price", "prices", "pricing", "catalog", "catalogue"],
+    "location_kw": ["location", "address", "where are you"],
+    "pay_kw": ["upi", "qr code", "pay now", "payment", "payments"],
+    "agent_kw": ["ai agent", "book an agent"],
+    "call_kw": ["book a call", "call", "calls"],
+    "back_kw": ["back"],
+    "change_kw": ["change", "changes"],
+    "confirm_kw": ["confirm", "confirmed", "yes, book", "yes please", "yes", "book it"],
+    "upi_kw": ["upi", "qr", "qrcode", "online", "pay now"],
+    "offline_kw": ["offline", "cash", "later"],
+    "greet_kw": ["hi", "hello", "hey"],
+    "how_are_you_kw": ["how are you"],
+    "who_are_you_kw": ["who are you"],
+    "wait_kw": ["wait", "hold on", "one sec", "hmm"],
+}
+
+MATCHER = PhraseMatcher({**INTENT_PHRASES, "small_talk": SMALL_TALK_PHRASES, **KEYWORD_GROUPS})
+
+
+def scan_text(text: str) -> Dict[str, List[Span]]:
+    return MATCHER.scan(text)
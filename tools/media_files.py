@@ -0,0 +1,77 @@
+# tools/media_files.py — resolve /media/... URLs to files and compute strong ETags
+import hashlib
+import os
+from typing import Optional
+
+from .startup import load_config
+from .ttl_cache import TTLCache
+from .generate_qr_code import QR_DIR
+from .text_to_speech import TTS_DIR
+from .static_assets import find_by_public_path
+
+load_config()
+
+MEDIA_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "media")
+)
+# Catalog/other media may change in place, so browsers revalidate after this.
+MEDIA_MAX_AGE = int(os.getenv("MEDIA_MAX_AGE", "86400"))
+# QR and TTS files are content-addressed and never change.
+IMMUTABLE_MAX_AGE = 31536000
+
+# path → (mtime_ns, size, etag); recomputed only when the file changes
+_ETAGS = TTLCache(maxsize=1024, ttl=IMMUTABLE_MAX_AGE)
+
+
+def _inside(root: str, path: str) -> bool:
+    root = os.path.abspath(root)
+    path = os.path.abspath(path)
+    return os.path.commonpath([root, path]) == root
+
+
+def resolve_media(filename: str) -> Optional[str]:
+    """
+    Map the part after /media/ to a file on disk, or None.
+    qr/<name>     → QR_DIR
+    tts/<name>    → TTS_DIR (cached reply audio)
+    <registered>  → tools/static_assets (e.g. the catalog)
+    anything else → MEDIA_ROOT, never outside it
+    """
+    name = filename.replace("\\", "/").lstrip("/")
+    if name.startswith("qr/"):
+        root, rel = QR_DIR, name[3:]
+    elif name.startswith("tts/"):
+        # only the audio: pending reply texts live in the same directory
+        root, rel = TTS_DIR, name[4:] if name.endswith(".wav") else ""
+    else:
+        asset = find_by_public_path(name)
+        if asset is not None:
+            return asset["path"]
+        root, rel = MEDIA_ROOT, name
+    path = os.path.join(root, rel)
+    if not rel or not _inside(root, path) or not os.path.isfile(path):
+        return None
+    return path
+
+
+def content_etag(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def file_etag(path: str) -> str:
+    """Strong ETag from the file's content hash, memoized on (mtime, size)."""
+    st = os.stat(path)
+    hit = _ETAGS.get(path)
+    if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        return hit[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    etag = h.hexdigest()[:32]
+    _ETAGS.set(path, (st.st_mtime_ns, st.st_size, etag))
+    return etag
+
+
+def is_immutable(filename: str) -> bool:
+    return filename.lstrip("/").startswith(("qr/", "tts/"))
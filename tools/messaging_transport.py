@@ -0,0 +1,102 @@
+# tools/messaging_transport.py — one shared WhatsApp transport for every sender
+import itertools
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from .startup import load_config
+
+load_config()
+
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
+TWILIO_WHATSAPP_FROM = os.getenv("TWILIO_WHATSAPP_FROM", "whatsapp:+14155238886")
+OWNER_WHATSAPP_TO = os.getenv("OWNER_WHATSAPP_TO", "")
+
+# twilio | fake  (fake keeps messages in memory, never touches the network)
+MESSAGING_TRANSPORT = os.getenv("MESSAGING_TRANSPORT", "twilio").strip().lower()
+TWILIO_HTTP_TIMEOUT = float(os.getenv("TWILIO_HTTP_TIMEOUT", "10"))
+TWILIO_POOL_SIZE = int(os.getenv("TWILIO_POOL_SIZE", "10"))
+
+
+class TwilioTransport:
+    """
+    Lazily builds a single twilio Client over a pooled, keep-alive
+    requests session and shares it across threads.
+    """
+
+    def __init__(self, account_sid: str, auth_token: str, from_: str):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_ = from_
+        self._client = None
+        self._lock = threading.Lock()
+
+    def configured(self) -> bool:
+        return bool(self.account_sid and self.auth_token and self.from_)
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from requests.adapters import HTTPAdapter
+                    from twilio.http.http_client import TwilioHttpClient
+                    from twilio.rest import Client
+
+                    http = TwilioHttpClient(pool_connections=True, timeout=TWILIO_HTTP_TIMEOUT)
+                    # default pool keeps 10 sockets per host; size it for the outbox workers
+                    http.session.mount(
+                        "https://",
+                        HTTPAdapter(pool_connections=1, pool_maxsize=TWILIO_POOL_SIZE),
+                    )
+                    self._client = Client(self.account_sid, self.auth_token, http_client=http)
+        return self._client
+
+    def send(self, to: str, body: str) -> Optional[str]:
+        msg = self._get_client().messages.create(body=body, from_=self.from_, to=to)
+        return getattr(msg, "sid", None)
+
+
+class FakeTransport:
+    """In-memory transport for tests and local runs; records every send."""
+
+    def __init__(self, from_: str = TWILIO_WHATSAPP_FROM):
+        self.from_ = from_
+        self.sent: List[Dict[str, Any]] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def configured(self) -> bool:
+        return True
+
+    def send(self, to: str, body: str) -> Optional[str]:
+        with self._lock:
+            sid = f"SMFAKE{next(self._ids):010d}"
+            self.sent.append({"sid": sid, "from": self.from_, "to": to, "body": body})
+        return sid
+
+
+_TRANSPORT = None
+_TRANSPORT_LOCK = threading.Lock()
+
+
+def _build_default():
+    if MESSAGING_TRANSPORT == "fake":
+        return FakeTransport()
+    return TwilioTransport(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_WHATSAPP_FROM)
+
+
+def get_transport():
+    global _TRANSPORT
+    if _TRANSPORT is None:
+        with _TRANSPORT_LOCK:
+            if _TRANSPORT is None:
+                _TRANSPORT = _build_default()
+    return _TRANSPORT
+
+
+def set_transport(transport) -> None:
+    """Swap the process-wide transport (e.g. FakeTransport() in tests)."""
+    global _TRANSPORT
+    with _TRANSPORT_LOCK:
+        _TRANSPORT = transport
@@ -0,0 +1,230 @@
+# tools/outbox.py — persistent background queue for outbound WhatsApp messages
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .send_whatsapp_text import send_whatsapp_text
+from .send_owner_msg import notify_owner
+from .tracing import start_trace, span, traced
+
+OUTBOX_DB_PATH = os.getenv(
+    "OUTBOX_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "outbox.db"),
+)
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "2"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "300"))
+# A 'sending' row older than this belongs to a dead process and is retried.
+OUTBOX_STALE_AFTER = float(os.getenv("OUTBOX_STALE_AFTER", "120"))
+
+# Twilio summaries that will not get better by retrying.
+PERMANENT_ERRORS = {
+    "twilio_not_configured",
+    "twilio_auth_failed",
+    "invalid_phone",
+    "invalid_owner_phone",
+}
+
+_SENDERS = {
+    "whatsapp": lambda row: send_whatsapp_text(to=row["recipient"], body=row["body"]),
+    "owner": lambda row: notify_owner(row["body"]),
+}
+
+_WAKE = threading.Event()
+_STOP = threading.Event()
+_START_LOCK = threading.Lock()
+_WORKERS: list = []
+
+
+def _connect() -> sqlite3.Connection:
+    con = sqlite3.connect(OUTBOX_DB_PATH, timeout=10)
+    con.row_factory = sqlite3.Row
+    return con
+
+
+def init_outbox():
+    """Create the outbox table and requeue messages left mid-send by a crash."""
+    with _connect() as con:
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idem_key TEXT UNIQUE,
+                kind TEXT,
+                recipient TEXT,
+                body TEXT,
+                status TEXT,
+                attempts INTEGER DEFAULT 0,
+                next_at REAL,
+                last_error TEXT,
+                sid TEXT,
+                created REAL,
+                updated REAL
+            )
+        """)
+        con.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_at)")
+        now = time.time()
+        con.execute(
+            "UPDATE outbox SET status = 'pending', updated = ? WHERE status = 'sending' AND updated < ?",
+            (now, now - OUTBOX_STALE_AFTER),
+        )
+        con.commit()
+
+
+@traced("outbox:enqueue")
+def enqueue_message(kind: str, body: str, to: str = "", idem_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Queue a message for background delivery.
+    kind: 'whatsapp' (to a user number) or 'owner'.
+    A second enqueue with the same idem_key is ignored.
+    Returns: {"ok": bool, "key": str, "queued": bool}
+    """
+    if kind not in _SENDERS:
+        return {"ok": False, "summary": f"unknown_kind:{kind}"}
+    key = idem_key or f"{kind}:{time.time_ns()}:{random.getrandbits(32):08x}"
+    now = time.time()
+    try:
+        start_workers()
+        with _connect() as con:
+            cur = con.execute(
+                """INSERT OR IGNORE INTO outbox
+                   (idem_key, kind, recipient, body, status, attempts, next_at, created, updated)
+                   VALUES (?, ?, ?, ?, 'pending', 0, ?, ?, ?)""",
+                (key, kind, to or "", body, now, now, now),
+            )
+            con.commit()
+            queued = cur.rowcount == 1
+    except Exception as e:
+        return {"ok": False, "key": key, "summary": f"outbox_error: {str(e)[:100]}"}
+
+    if queued:
+        _WAKE.set()
+    return {"ok": True, "key": key, "queued": queued}
+
+
+def delivery_status(idem_key: str) -> Dict[str, Any]:
+    """
+    Returns: {"ok": bool, "status": "pending|sending|sent|failed", "attempts": int, "sid": str, "last_error": str}
+    """
+    try:
+        with _connect() as con:
+            row = con.execute(
+                "SELECT status, attempts, sid, last_error, updated FROM outbox WHERE idem_key = ?",
+                (idem_key,),
+            ).fetchone()
+    except Exception as e:
+        return {"ok": False, "summary": f"outbox_error: {str(e)[:100]}"}
+    if not row:
+        return {"ok": False, "summary": "not_found"}
+    return {"ok": True, **dict(row)}
+
+
+def _claim_next() -> Optional[Dict[str, Any]]:
+    now = time.time()
+    con = _connect()
+    try:
+        con.execute("BEGIN IMMEDIATE")
+        row = con.execute(
+            """SELECT * FROM outbox WHERE status = 'pending' AND next_at <= ?
+               ORDER BY next_at LIMIT 1""",
+            (now,),
+        ).fetchone()
+        if row is None:
+            con.rollback()
+            return None
+        con.execute(
+            "UPDATE outbox SET status = 'sending', attempts = attempts + 1, updated = ? WHERE id = ?",
+            (now, row["id"]),
+        )
+        con.commit()
+        out = dict(row)
+        out["attempts"] += 1
+        return out
+    finally:
+        con.close()
+
+
+def _next_due_in() -> float:
+    with _connect() as con:
+        row = con.execute(
+            "SELECT MIN(next_at) FROM outbox WHERE status = 'pending'"
+        ).fetchone()
+    if not row or row[0] is None:
+        return OUTBOX_BACKOFF_MAX
+    return max(0.0, row[0] - time.time())
+
+
+def _finish(row: Dict[str, Any], res: Dict[str, Any]) -> None:
+    now = time.time()
+    summary = res.get("summary", "")
+    if res.get("ok"):
+        status, next_at, err = "sent", row["next_at"], None
+    elif summary in PERMANENT_ERRORS or row["attempts"] >= OUTBOX_MAX_ATTEMPTS:
+        status, next_at, err = "failed", row["next_at"], summary
+    else:
+        delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** (row["attempts"] - 1)))
+        status, next_at, err = "pending", now + delay * random.uniform(0.8, 1.2), summary
+    with _connect() as con:
+        con.execute(
+            """UPDATE outbox SET status = ?, next_at = ?, last_error = ?, sid = ?, updated = ?
+               WHERE id = ?""",
+            (status, next_at, err, res.get("sid"), now, row["id"]),
+        )
+        con.commit()
+
+
+def _worker_loop():
+    while not _STOP.is_set():
+        # clear before polling so an enqueue during the poll is not missed
+        _WAKE.clear()
+        try:
+            row = _claim_next()
+        except Exception:
+            row = None
+        if row is None:
+            try:
+                wait = min(_next_due_in(), 5.0)
+            except Exception:
+                wait = 1.0
+            _WAKE.wait(wait)
+            continue
+        # deliveries run off the request path, so each one is its own trace
+        with start_trace("outbox:deliver", kind=row["kind"], idem_key=row["idem_key"]):
+            with span("twilio:send", attempt=row["attempts"]) as sp:
+                try:
+                    res = _SENDERS[row["kind"]](row) or {}
+                except Exception as e:
+                    res = {"ok": False, "summary": f"send_exception: {str(e)[:100]}"}
+                sp.set("ok", bool(res.get("ok")))
+        try:
+            _finish(row, res)
+        except Exception:
+            pass
+
+
+def start_workers():
+    """Start the delivery threads once per process (idempotent)."""
+    if _WORKERS:
+        return
+    with _START_LOCK:
+        if _WORKERS:
+            return
+        init_outbox()
+        _STOP.clear()
+        for i in range(max(1, OUTBOX_WORKERS)):
+            t = threading.Thread(target=_worker_loop, name=f"outbox-{i}", daemon=True)
+            t.start()
+            _WORKERS.append(t)
+
+
+def stop_workers(timeout: float = 10.0):
+    """Let in-flight sends finish, then stop the delivery threads."""
+    _STOP.set()
+    _WAKE.set()
+    deadline = time.time() + timeout
+    for t in list(_WORKERS):
+        t.join(max(0.0, deadline - time.time()))
+    _WORKERS.clear()
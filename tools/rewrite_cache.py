@@ -0,0 +1,80 @@
+# tools/rewrite_cache.py — LRU/TTL cache of LLM rewrites keyed on (draft, tone)
+import os
+import random
+import re
+import threading
+from typing import Any, Dict, Optional
+
+from .ttl_cache import TTLCache
+
+REWRITE_CACHE_SIZE = int(os.getenv("REWRITE_CACHE_SIZE", "512"))
+REWRITE_CACHE_TTL = float(os.getenv("REWRITE_CACHE_TTL", "21600"))
+# How many LLM rewrites to collect per key before serving only from memory.
+REWRITE_CACHE_VARIANTS = int(os.getenv("REWRITE_CACHE_VARIANTS", "3"))
+
+_CASUAL_WORDS = {
+    "bro", "dude", "yaar", "bhai", "buddy", "man", "lol", "pls", "plz",
+    "thx", "ya", "yeah", "yep", "nah", "gonna", "wanna", "u", "ur", "ok", "okay", "k",
+}
+_WORD_RE = re.compile(r"[a-z']+")
+_WS_RE = re.compile(r"\s+")
+
+# key → {"fills": int, "variants": [str]}; _LOCK guards the entry dicts
+_ENTRIES = TTLCache(maxsize=REWRITE_CACHE_SIZE, ttl=REWRITE_CACHE_TTL)
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "stores": 0}
+
+
+def tone_class(user_text: str) -> str:
+    """Coarse tone of the user message: 'casual' or 'formal'."""
+    low = (user_text or "").lower()
+    words = set(_WORD_RE.findall(low))
+    if words & _CASUAL_WORDS or "!!" in low:
+        return "casual"
+    return "formal"
+
+
+def normalize_draft(core: str) -> str:
+    return _WS_RE.sub(" ", (core or "").strip())
+
+
+def _key(core: str, user_text: str) -> tuple:
+    # safe to share across sessions: the rewrite prompt sees only the draft and the tone
+    return (normalize_draft(core), tone_class(user_text))
+
+
+def get_cached_rewrite(core: str, user_text: str) -> Optional[str]:
+    """
+    Return a cached rewrite once the key has been filled REWRITE_CACHE_VARIANTS
+    times; until then return None so the caller asks the LLM again.
+    """
+    entry = _ENTRIES.get(_key(core, user_text))
+    with _LOCK:
+        if entry is None or entry["fills"] < REWRITE_CACHE_VARIANTS:
+            _STATS["misses"] += 1
+            return None
+        _STATS["hits"] += 1
+        return random.choice(entry["variants"])
+
+
+def store_rewrite(core: str, user_text: str, rewritten: str) -> None:
+    key = _key(core, user_text)
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        if entry is None:
+            entry = {"fills": 0, "variants": []}
+            _ENTRIES.set(key, entry)
+        entry["fills"] += 1
+        if rewritten not in entry["variants"]:
+            entry["variants"].append(rewritten)
+            _STATS["stores"] += 1
+
+
+def rewrite_cache_stats() -> Dict[str, Any]:
+    cache = _ENTRIES.stats()
+    with _LOCK:
+        out = dict(_STATS)
+    out.update(size=cache["size"], evictions=cache["evictions"], expired=cache["expirations"])
+    total = out["hits"] + out["misses"]
+    out["hit_rate"] = round(out["hits"] / total, 3) if total else 0.0
+    return out
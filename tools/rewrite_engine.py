@@ -0,0 +1,79 @@
+# tools/rewrite_engine.py — deadline-bounded, concurrency-limited LLM calls
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict
+
+REWRITE_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "4"))
+REWRITE_MAX_INFLIGHT = int(os.getenv("REWRITE_MAX_INFLIGHT", "4"))
+
+# One worker per in-flight slot: a call is either running or rejected, never queued.
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=REWRITE_MAX_INFLIGHT, thread_name_prefix="rewrite"
+)
+_SLOTS = threading.BoundedSemaphore(REWRITE_MAX_INFLIGHT)
+
+_STATS_LOCK = threading.Lock()
+_STATS = {"ok": 0, "timeout": 0, "shed": 0, "error": 0, "late": 0}
+
+
+def _bump(key: str) -> None:
+    with _STATS_LOCK:
+        _STATS[key] += 1
+
+
+def _release(future) -> None:
+    # Slot is only returned when the call really finishes, so abandoned
+    # calls still count against the limit while they hang on the network.
+    _SLOTS.release()
+    if future.cancelled():
+        return
+    if getattr(future, "_abandoned", False):
+        _bump("late")
+
+
+def call_with_deadline(
+    fn: Callable[..., Any], *args, fallback: Any = None, timeout: float = None, **kwargs
+) -> Any:
+    """
+    Run fn(*args, **kwargs) on the bounded rewrite pool.
+    Returns fallback immediately if:
+      - all slots are busy (brown-out shedding),
+      - the call does not finish within `timeout` seconds,
+      - the call raises.
+    Late results are discarded.
+    """
+    budget = REWRITE_TIMEOUT if timeout is None else timeout
+    if not _SLOTS.acquire(blocking=False):
+        _bump("shed")
+        return fallback
+
+    try:
+        future = _EXECUTOR.submit(fn, *args, **kwargs)
+    except Exception:
+        _SLOTS.release()
+        _bump("error")
+        return fallback
+    future.add_done_callback(_release)
+
+    try:
+        result = future.result(timeout=budget)
+    except FutureTimeout:
+        future._abandoned = True
+        future.cancel()
+        _bump("timeout")
+        return fallback
+    except Exception:
+        _bump("error")
+        return fallback
+
+    _bump("ok")
+    return result
+
+
+def rewrite_stats() -> Dict[str, Any]:
+    with _STATS_LOCK:
+        out = dict(_STATS)
+    out["timeout_s"] = REWRITE_TIMEOUT
+    out["max_inflight"] = REWRITE_MAX_INFLIGHT
+    return out
@@ -0,0 +1,64 @@
+# tools/rewrite_policy.py — decide per reply whether an LLM rewrite is worth it
+import os
+import re
+import threading
+from typing import Any, Dict, Optional
+
+# auto   → skip transactional replies, rewrite conversational ones
+# always → rewrite everything (old behaviour)
+# never  → never call the LLM
+REWRITE_POLICY = os.getenv("REWRITE_POLICY", "auto").strip().lower()
+# Drafts longer than this are left alone: the rewrite prompt caps output at 2 sentences.
+REWRITE_MAX_CHARS = int(os.getenv("REWRITE_MAX_CHARS", "400"))
+
+# (reason, pattern) — any match marks the draft as structured/transactional.
+TRANSACTIONAL_RULES = [
+    ("url", re.compile(r"https?://|/media/", re.I)),
+    ("booking_id", re.compile(r"\bbooking id\b", re.I)),
+    ("bullet_list", re.compile(r"^\s*[-•*]\s+\S", re.M)),
+    ("amount", re.compile(r"[₹$€£]\s?\d|\b(?:inr|usd|rs\.?)\s?\d", re.I)),
+    ("phone", re.compile(r"\+\d[\d\s\-]{6,}\d")),
+]
+
+_LOCK = threading.Lock()
+_STATS: Dict[str, int] = {"rewrite": 0, "skipped": 0}
+
+
+def classify_reply(core: str) -> Dict[str, Any]:
+    """
+    Returns: {"kind": "transactional" | "conversational", "reason": str | None}
+    """
+    text = core or ""
+    for reason, pattern in TRANSACTIONAL_RULES:
+        if pattern.search(text):
+            return {"kind": "transactional", "reason": reason}
+    if len(text) > REWRITE_MAX_CHARS:
+        return {"kind": "transactional", "reason": "too_long"}
+    return {"kind": "conversational", "reason": None}
+
+
+def should_rewrite(core: str, policy: Optional[str] = None) -> bool:
+    mode = (policy or REWRITE_POLICY)
+    if mode == "always":
+        decision, reason = True, None
+    elif mode == "never":
+        decision, reason = False, "policy_never"
+    else:
+        cls = classify_reply(core)
+        decision = cls["kind"] == "conversational"
+        reason = cls["reason"]
+
+    with _LOCK:
+        if decision:
+            _STATS["rewrite"] += 1
+        else:
+            _STATS["skipped"] += 1
+            _STATS[f"skipped:{reason}"] = _STATS.get(f"skipped:{reason}", 0) + 1
+    return decision
+
+
+def rewrite_policy_stats() -> Dict[str, Any]:
+    with _LOCK:
+        out: Dict[str, Any] = dict(_STATS)
+    out["policy"] = REWRITE_POLICY
+    return out
@@ -2,13 +2,72 @@
 import os
 import uuid
 import json
+import threading
 from typing import Dict, Any
+
+from .tracing import traced
+
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bookings.db")
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Statements are module constants so sqlite3's per-connection statement
+# cache reuses the prepared form on every call.
+_SQL_INSERT = "INSERT INTO bookings VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)"
+_SQL_BY_ID = "SELECT * FROM bookings WHERE booking_id=?"
+_SQL_CANCEL = "UPDATE bookings SET status = ? WHERE booking_id = ?"
+
+_KEYS = [
+    "booking_id", "session", "phone", "name", "type", "agent_type", "base",
+    "addons", "custom", "date", "time", "status", "amount"
+]
+
+_local = threading.local()
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def _conn() -> sqlite3.Connection:
+    """One long-lived connection per thread (sqlite3 connections are not shareable)."""
+    con = getattr(_local, "con", None)
+    if con is None:
+        con = sqlite3.connect(
+            DB_PATH,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            cached_statements=64,
+        )
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        _local.con = con
+    if not _schema_ready:
+        _ensure_schema(con)
+    return con
+
+
+def close_thread_connection():
+    """Close this thread's connection (worker shutdown / tests)."""
+    con = getattr(_local, "con", None)
+    if con is not None:
+        con.close()
+        _local.con = None
+
+
 def init_db():
-    """Initialize bookings database"""
-    with sqlite3.connect(DB_PATH) as con:
-        cur = con.cursor()
-        cur.execute("""
+    """Initialize bookings database (also done lazily on first use)"""
+    _conn()
+
+
+def _ensure_schema(con: sqlite3.Connection):
+    global _schema_ready
+    with _schema_lock:
+        if not _schema_ready:
+            _create_schema(con)
+            _schema_ready = True
+
+
+def _create_schema(con: sqlite3.Connection):
+    with con:
+        con.execute("""
             CREATE TABLE IF NOT EXISTS bookings (
                 booking_id TEXT PRIMARY KEY,
                 session TEXT,
@@ -25,7 +84,10 @@ def init_db():
                 amount REAL
             )
         """)
-        con.commit()
+        con.execute("CREATE INDEX IF NOT EXISTS idx_bookings_session ON bookings(session)")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_bookings_phone ON bookings(phone)")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings(status)")
+@traced("db:save_booking")
 def save_booking(
     session: str,
     phone: str,
@@ -46,10 +108,10 @@ def save_booking(
     """
     try:
         bid = uuid.uuid4().hex[:8].upper()
-        with sqlite3.connect(DB_PATH) as con:
-            cur = con.cursor()
-            cur.execute(
-                """INSERT INTO bookings VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)""",
+        con = _conn()
+        with con:
+            con.execute(
+                _SQL_INSERT,
                 (
                     bid,
                     session,
@@ -66,27 +128,20 @@ def save_booking(
                     final_amount
                 )
             )
-            con.commit()
         return {"ok": True, "booking_id": bid}
     except Exception as e:
         return {"ok": False, "error": str(e), "summary": f"Database error: {str(e)}"}
+@traced("db:get_booking")
 def get_booking_by_id(booking_id: str) -> Dict[str, Any]:
     """
     Retrieve booking by ID.
     Returns: {"ok": bool, "booking": {...}}
     """
     try:
-        with sqlite3.connect(DB_PATH) as con:
-            cur = con.cursor()
-            cur.execute("SELECT * FROM bookings WHERE booking_id=?", (booking_id,))
-            row = cur.fetchone()
+        row = _conn().execute(_SQL_BY_ID, (booking_id,)).fetchone()
         if not row:
             return {"ok": False, "summary": "Booking not found"}
-        keys = [
-            "booking_id", "session", "phone", "name", "type", "agent_type", "base",
-            "addons", "custom", "date", "time", "status", "amount"
-        ]
-        data = dict(zip(keys, row))
+        data = dict(zip(_KEYS, row))
         data["addons"] = json.loads(data["addons"]) if data["addons"] else []
         data["custom"] = json.loads(data["custom"]) if data["custom"] else []
         data["final_amount"] = data["amount"]
@@ -99,13 +154,9 @@ def cancel_booking(booking_id: str) -> Dict[str, Any]:
     Returns: {"ok": bool, "summary": str}
     """
     try:
-        with sqlite3.connect(DB_PATH) as con:
-            cur = con.cursor()
-            cur.execute(
-                "UPDATE bookings SET status = ? WHERE booking_id = ?",
-                ("cancelled", booking_id)
-            )
-            con.commit()
+        con = _conn()
+        with con:
+            cur = con.execute(_SQL_CANCEL, ("cancelled", booking_id))
             changed = cur.rowcount
         if changed:
             return {"ok": True, "summary": f"Booking {booking_id} cancelled"}
@@ -1,12 +1,16 @@
 ﻿import os
 from typing import Dict, Any
-from dotenv import load_dotenv
+from .startup import load_config
 
-load_dotenv()
+load_config()
 
 MAP_LINK = os.getenv("MAP_GOOGLE_LINK", "https://maps.google.com/?q=40.7128,-74.0060")
 ADDRESS = os.getenv("OFFICE_ADDRESS", "496 - Lakeview Street, New York")
 
+# config never changes at runtime: validate and build the reply once
+_LOCATION_OK = bool(MAP_LINK) and MAP_LINK.startswith("http")
+_LOCATION_TEXT = f"Location: {ADDRESS}"
+
 
 def send_location(session: str, phone: str = None) -> Dict[str, Any]:
     """
@@ -15,14 +19,13 @@ def send_location(session: str, phone: str = None) -> Dict[str, Any]:
     No media via WhatsApp; UI uses public_url.
     """
     try:
-        if not MAP_LINK or not MAP_LINK.startswith("http"):
+        if not _LOCATION_OK:
             return {"ok": False, "summary": "Map link not configured properly"}
 
-        text = f"Location: {ADDRESS}"
         return {
             "ok": True,
             "location_url": MAP_LINK,
-            "text": text,
+            "text": _LOCATION_TEXT,
             "summary": "Location ready",
         }
     except Exception as e:
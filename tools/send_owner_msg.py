@@ -1,12 +1,5 @@
-﻿import os
-from typing import Dict, Any
-from twilio.rest import Client
-from dotenv import load_dotenv
-load_dotenv()
-TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_WHATSAPP_FROM = os.getenv("TWILIO_WHATSAPP_FROM")
-OWNER_WHATSAPP_TO = os.getenv("OWNER_WHATSAPP_TO")  
+﻿from typing import Dict, Any
+from .messaging_transport import get_transport, OWNER_WHATSAPP_TO
 def _normalize_phone(phone: str) -> str:
     """Normalize phone to WhatsApp format"""
     if not phone:
@@ -25,23 +18,19 @@ def notify_owner(message: str) -> Dict[str, Any]:
     Returns: {"ok": bool, "summary": str, "sid": str}
     """
     try:
-        if not all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_WHATSAPP_FROM, OWNER_WHATSAPP_TO]):
+        transport = get_transport()
+        if not (transport.configured() and OWNER_WHATSAPP_TO):
             return {
                 "ok": False,
                 "summary": "twilio_not_configured"
             }
         to_normalized = _normalize_phone(OWNER_WHATSAPP_TO)
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        msg = client.messages.create(
-            body=message,
-            from_=TWILIO_WHATSAPP_FROM,
-            to=to_normalized
-        )
-        if msg and hasattr(msg, "sid"):
+        sid = transport.send(to_normalized, message)
+        if sid:
             return {
                 "ok": True,
                 "summary": "sent",
-                "sid": msg.sid
+                "sid": sid
             }
         return {
             "ok": False,
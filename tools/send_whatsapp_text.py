@@ -1,13 +1,7 @@
 ﻿# tools/send_whatsapp_text.py — text-only robust wrapper
-import os
 from typing import Dict, Any
-from dotenv import load_dotenv
 
-load_dotenv()
-
-TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
-TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
-TWILIO_WHATSAPP_FROM = os.getenv("TWILIO_WHATSAPP_FROM", "whatsapp:+14155238886")
+from .messaging_transport import get_transport
 
 
 def _normalize(to: str) -> str:
@@ -24,19 +18,17 @@ def send_whatsapp_text(to: str, body: str) -> Dict[str, Any]:
     Text-only WhatsApp sending. No media.
     """
     try:
-        if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_WHATSAPP_FROM):
+        transport = get_transport()
+        if not transport.configured():
             return {"ok": False, "summary": "twilio_not_configured"}
 
-        from twilio.rest import Client
-
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
         to_norm = _normalize(to)
         num = to_norm.replace("whatsapp:", "")
         if not num.startswith("+"):
             num = f"+{num}"
         to_norm = f"whatsapp:{num}"
-        msg = client.messages.create(body=body, from_=TWILIO_WHATSAPP_FROM, to=to_norm)
-        return {"ok": True, "summary": "sent", "sid": getattr(msg, "sid", None)}
+        sid = transport.send(to_norm, body)
+        return {"ok": True, "summary": "sent", "sid": sid}
     except Exception as e:
         err = str(e).lower()
         if "invalid" in err or "phone" in err:
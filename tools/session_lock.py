@@ -0,0 +1,113 @@
+# tools/session_lock.py — serialize turns per session_id, parallel across sessions
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from .session_store import SESSION_STORE, SESSION_DB_PATH
+
+try:
+    import fcntl
+except ImportError:  # Windows dev box: single process only
+    fcntl = None
+
+SESSION_LOCK_TIMEOUT = float(os.getenv("SESSION_LOCK_TIMEOUT", "8"))
+# With the shared sqlite store several gunicorn workers serve the same sid, so
+# the turn also takes an flock on a lock file shared by every worker on the host.
+SESSION_LOCK_CROSS_PROCESS = os.getenv(
+    "SESSION_LOCK_CROSS_PROCESS", "1" if SESSION_STORE == "sqlite" else "0"
+) == "1" and fcntl is not None
+SESSION_LOCK_DIR = os.getenv("SESSION_LOCK_DIR", SESSION_DB_PATH + ".locks")
+# sids hash onto this many lock files (unrelated sids rarely share one)
+SESSION_LOCK_STRIPES = int(os.getenv("SESSION_LOCK_STRIPES", "1024"))
+
+if SESSION_LOCK_CROSS_PROCESS:
+    os.makedirs(SESSION_LOCK_DIR, exist_ok=True)
+
+
+class SessionBusy(Exception):
+    """Raised when a turn could not get its session lock within the wait budget."""
+
+
+# sid -> [lock, number of threads holding or waiting]; dropped when unused
+_LOCKS: Dict[str, list] = {}
+_GUARD = threading.Lock()
+_STATS = {"acquired": 0, "contended": 0, "timeouts": 0, "process_contended": 0}
+
+
+def _lock_path(key: str) -> str:
+    h = int(hashlib.sha1(key.encode("utf-8")).hexdigest()[:8], 16) % SESSION_LOCK_STRIPES
+    return os.path.join(SESSION_LOCK_DIR, f"{h:04x}.lock")
+
+
+def _flock(key: str, deadline: float) -> Optional[int]:
+    """Exclusive flock on the sid's lock file; the fd to release, or None on timeout."""
+    fd = os.open(_lock_path(key), os.O_RDWR | os.O_CREAT, 0o600)
+    delay, waited = 0.005, False
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if waited:
+                with _GUARD:
+                    _STATS["process_contended"] += 1
+            return fd
+        except BlockingIOError:
+            pass
+        if time.monotonic() >= deadline:
+            os.close(fd)
+            return None
+        waited = True
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(delay * 2, 0.05)
+
+
+@contextmanager
+def session_lock(sid: Any, timeout: Optional[float] = None):
+    key = str(sid)
+    wait = SESSION_LOCK_TIMEOUT if timeout is None else timeout
+    with _GUARD:
+        entry = _LOCKS.get(key)
+        if entry is None:
+            entry = _LOCKS[key] = [threading.Lock(), 0]
+        entry[1] += 1
+        contended = entry[1] > 1
+
+    lock = entry[0]
+    deadline = time.monotonic() + wait
+    acquired = lock.acquire(timeout=wait)
+    fd = None
+    if acquired and SESSION_LOCK_CROSS_PROCESS:
+        # threads of this worker queue on the Lock above; only the holder polls the file
+        fd = _flock(key, deadline)
+        if fd is None:
+            lock.release()
+            acquired = False
+    try:
+        with _GUARD:
+            if contended:
+                _STATS["contended"] += 1
+            _STATS["acquired" if acquired else "timeouts"] += 1
+        if not acquired:
+            raise SessionBusy(key)
+        yield
+    finally:
+        if acquired:
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+            lock.release()
+        with _GUARD:
+            entry[1] -= 1
+            if entry[1] == 0 and _LOCKS.get(key) is entry:
+                del _LOCKS[key]
+
+
+def session_lock_stats() -> Dict[str, Any]:
+    with _GUARD:
+        out = dict(_STATS)
+        out["active"] = len(_LOCKS)
+    out["timeout_s"] = SESSION_LOCK_TIMEOUT
+    out["cross_process"] = SESSION_LOCK_CROSS_PROCESS
+    return out
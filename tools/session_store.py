@@ -0,0 +1,137 @@
+# tools/session_store.py — pluggable session storage (in-memory LRU+TTL or shared SQLite)
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .ttl_cache import TTLCache
+
+# memory → per-process LRU dict (single worker)
+# sqlite → shared file, visible to every worker on the host
+SESSION_STORE = os.getenv("SESSION_STORE", "memory").strip().lower()
+SESSION_TTL = float(os.getenv("SESSION_TTL", "7200"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "5000"))
+SESSION_DB_PATH = os.getenv(
+    "SESSION_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db"),
+)
+# Only the most recent turns are kept in sess["hist"].
+HIST_WINDOW = int(os.getenv("SESSION_HIST_WINDOW", "20"))
+
+
+def trim_history(sess: Dict[str, Any], window: int = HIST_WINDOW) -> None:
+    hist = sess.get("hist")
+    if hist and len(hist) > window:
+        del hist[:-window]
+
+
+class SessionStore(abc.ABC):
+    """get() returns the session dict or None; put() must be called after a turn mutates it."""
+
+    @abc.abstractmethod
+    def get(self, sid: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abc.abstractmethod
+    def put(self, sid: str, sess: Dict[str, Any]) -> None:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, sid: str) -> None:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, max_sessions: int = SESSION_MAX, ttl: float = SESSION_TTL):
+        # put() after every turn refreshes the TTL, so it acts as an idle timeout
+        self._cache = TTLCache(maxsize=max_sessions, ttl=ttl)
+
+    def get(self, sid):
+        return self._cache.get(sid)
+
+    def put(self, sid, sess):
+        self._cache.set(sid, sess)
+
+    def delete(self, sid):
+        self._cache.pop(sid)
+
+    def stats(self):
+        out = self._cache.stats()
+        out["backend"] = "memory"
+        return out
+
+
+class SQLiteSessionStore(SessionStore):
+    # expired rows are swept on every Nth put instead of on a timer
+    SWEEP_EVERY = 200
+
+    def __init__(self, path: str = SESSION_DB_PATH, ttl: float = SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._puts = 0
+        self._puts_lock = threading.Lock()
+        self._local = threading.local()
+        with self._conn() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    sid TEXT PRIMARY KEY,
+                    data TEXT,
+                    updated REAL
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated)")
+            con.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            self._local.con = con
+        return con
+
+    def get(self, sid):
+        row = self._conn().execute(
+            "SELECT data, updated FROM sessions WHERE sid = ?", (str(sid),)
+        ).fetchone()
+        if not row:
+            return None
+        if time.time() - row[1] > self.ttl:
+            self.delete(sid)
+            return None
+        return json.loads(row[0])
+
+    def put(self, sid, sess):
+        con = self._conn()
+        with con:
+            con.execute(
+                "INSERT OR REPLACE INTO sessions (sid, data, updated) VALUES (?, ?, ?)",
+                (str(sid), json.dumps(sess, default=str), time.time()),
+            )
+        with self._puts_lock:
+            self._puts += 1
+            sweep = self._puts % self.SWEEP_EVERY == 0
+        if sweep:
+            with con:
+                con.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - self.ttl,))
+
+    def delete(self, sid):
+        con = self._conn()
+        with con:
+            con.execute("DELETE FROM sessions WHERE sid = ?", (str(sid),))
+
+    def stats(self):
+        row = self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()
+        return {"backend": "sqlite", "size": row[0] if row else 0}
+
+
+def build_session_store(kind: str = SESSION_STORE) -> SessionStore:
+    if kind == "sqlite":
+        return SQLiteSessionStore()
+    return MemorySessionStore()
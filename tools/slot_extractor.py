@@ -1,5 +1,6 @@
 # tools/slot_extractor.py
 import re
+from itertools import islice
 from typing import Dict, Any
 
 PHONE_RE = re.compile(r"(\+?\d[\d\-\s]{6,}\d)")
@@ -36,37 +37,82 @@ def clean_phone(raw: str) -> str:
     return p
 
 
-def extract_slots_from_text(text: str) -> Dict[str, Any]:
+TOKEN_RE = re.compile(r"\S+")
+# country code + national number inside an already-found phone span
+CC_SPLIT_RE = re.compile(r"(\+\d{1,3})\D*(\d{6,15})")
+
+# Slots found by these sources are guesses; extract_slots_from_text leaves them out.
+FALLBACK_SOURCES = {"two_word_name", "digits_fallback", "phone_split"}
+
+CUSTOM_RE = re.compile(r"(?:custom|feature|add-on|addons?)[:\-]?\s*(.+)$", re.I)
+
+NAME_STOPWORDS = ["book", "agent", "call", "price", "catalog", "location"]
+
+
+def _slot(value: Any, confidence: float, span, source: str) -> Dict[str, Any]:
+    return {"value": value, "confidence": confidence, "span": span, "source": source}
+
+
+def _overlaps(span, claimed) -> bool:
+    return any(span[0] < e and s < span[1] for s, e in claimed)
+
+
+def extract_slot_details(text: str) -> Dict[str, Dict[str, Any]]:
+    """
+    One call for every slot. Each field still has its own precompiled
+    regex / keyword scan over the text (there is no shared tokenizer), but
+    they run once per turn instead of three times, the country code is split
+    from the phone span, and later extractors skip spans already claimed
+    (a date's day number is never read as a time).
+    Returns: {slot: {"value", "confidence", "span": (start, end), "source"}}
+    """
     if not text:
         return {}
     t = text.strip()
     low = t.lower()
-    slots: Dict[str, Any] = {}
+    out: Dict[str, Dict[str, Any]] = {}
+    claimed = []
 
-    # PHONE
+    # PHONE (+ country code split from the same span)
     ph = PHONE_RE.search(t)
     if ph:
-        slots["phone"] = clean_phone(ph.group(1))
+        raw = ph.group(1)
+        out["phone"] = _slot(clean_phone(raw), 0.95 if raw.startswith("+") else 0.85, ph.span(1), "phone_re")
+        claimed.append(ph.span(1))
+        cc = CC_SPLIT_RE.search(raw)
+        if cc:
+            start = ph.start(1)
+            out["country_code"] = _slot(cc.group(1), 0.6, (start + cc.start(1), start + cc.end(1)), "phone_split")
+    else:
+        digits = re.sub(r"\D", "", t)
+        if len(digits) >= 8:
+            out["phone"] = _slot(digits, 0.3, (0, len(t)), "digits_fallback")
 
     # NAME via explicit pattern
     mname = NAME_RE.search(t)
     if mname:
-        slots["name"] = mname.group(1).strip()
+        out["name"] = _slot(mname.group(1).strip(), 0.9, mname.span(1), "name_re")
 
     # DATE
     d = DATE_HINT_RE.search(t)
     if d:
-        slots["date"] = d.group(1)
-
-    # TIME (only if looks like time, not just "7")
-    tm = TIME_RE.search(t)
-    if tm and (":" in tm.group(1) or re.search(r"\b(am|pm)\b", tm.group(1), re.I)):
-        slots["time"] = tm.group(1)
+        out["date"] = _slot(d.group(1), 0.8, d.span(1), "date_re")
+        claimed.append(d.span(1))
+
+    # TIME (only if looks like time, not just "7"; never inside phone/date)
+    for tm in TIME_RE.finditer(t):
+        val = tm.group(1)
+        if _overlaps(tm.span(1), claimed):
+            continue
+        if ":" in val or re.search(r"\b(am|pm)\b", val, re.I):
+            out["time"] = _slot(val, 0.8, tm.span(1), "time_re")
+            break
 
     # GENRE
     for g in GENRES:
-        if g in low:
-            slots["genre"] = g
+        i = low.find(g)
+        if i >= 0:
+            out["genre"] = _slot(g, 0.7, (i, i + len(g)), "genre_kw")
             break
 
     # ADDONS
@@ -77,26 +123,36 @@ def extract_slots_from_text(text: str) -> Dict[str, Any]:
                 addons.append(k)
                 break
     if addons:
-        slots["addons"] = addons
+        out["addons"] = _slot(addons, 0.7, None, "addon_kw")
 
     # custom features phrase
-    m_custom = re.search(
-        r"(?:custom|feature|add-on|addons?)[:\-]?\s*(.+)$", t, re.I
-    )
+    m_custom = CUSTOM_RE.search(t)
     if m_custom:
         val = m_custom.group(1).strip()
         if val:
-            slots["custom_features"] = val
+            out["custom_features"] = _slot(val, 0.5, m_custom.span(1), "custom_re")
 
     # Plain-name fallback: if NO name yet & text is just a name-like string
-    if "name" not in slots:
-        if PLAIN_NAME_RE.match(t) and not any(
-            kw in low
-            for kw in ["book", "agent", "call", "price", "catalog", "location"]
-        ):
-            slots["name"] = t.strip()
-
-    return slots
+    if "name" not in out:
+        if PLAIN_NAME_RE.match(t) and not any(kw in low for kw in NAME_STOPWORDS):
+            out["name"] = _slot(t, 0.6, (0, len(t)), "plain_name")
+        else:
+            # weakest guess: first two words
+            first = list(islice(TOKEN_RE.finditer(t), 2))
+            if len(first) == 2 and all(m.group(0)[0].isalpha() for m in first):
+                span = (first[0].start(), first[1].end())
+                out["name"] = _slot(f"{first[0].group(0)} {first[1].group(0)}", 0.3, span, "two_word_name")
+
+    return out
+
+
+def extract_slots_from_text(text: str) -> Dict[str, Any]:
+    """Plain {slot: value} view of extract_slot_details, without fallback guesses."""
+    return {
+        k: v["value"]
+        for k, v in extract_slot_details(text).items()
+        if v["source"] not in FALLBACK_SOURCES
+    }
 
 
 if __name__ == "__main__":
@@ -1,6 +1,254 @@
+# tools/speech_to_text.py — offline CPU transcription (ffmpeg decode + faster-whisper)
+import logging
+import os
+import subprocess
+import threading
+import time
+from typing import Any, Dict
+
+from .startup import lazy_import, load_config, timed
+from .tracing import span
+
+load_config()
+log = logging.getLogger(__name__)
+
+# ffmpeg-python only builds the command line; the ffmpeg binary must be on PATH
+ffmpeg = lazy_import("ffmpeg")
+np = lazy_import("numpy")
+faster_whisper = lazy_import("faster_whisper")
+
+# faster_whisper | none  (none keeps the old "[voice message]" placeholder)
+STT_ENGINE = os.getenv("STT_ENGINE", "faster_whisper").strip().lower()
+# tiny.en / base.en / small.en ... or a local CTranslate2 model directory;
+# bigger is more accurate and slower
+STT_MODEL_SIZE = os.getenv("STT_MODEL_SIZE", "base.en")
+STT_COMPUTE_TYPE = os.getenv("STT_COMPUTE_TYPE", "int8")
+STT_CPU_THREADS = int(os.getenv("STT_CPU_THREADS", "0"))  # 0 = ctranslate2 default
+STT_LANGUAGE = os.getenv("STT_LANGUAGE", "en") or None
+# greedy decoding; raise for accuracy at a latency cost
+STT_BEAM_SIZE = int(os.getenv("STT_BEAM_SIZE", "1"))
+# audio is decoded in windows of this many seconds
+STT_CHUNK_SECONDS = int(os.getenv("STT_CHUNK_SECONDS", "30"))
+# skip silence before running the model (pauses are most of a voice note)
+STT_VAD = os.getenv("STT_VAD", "1") == "1"
+# longer audio is rejected (413), not transcribed; ffmpeg stops decoding just past it
+STT_MAX_SECONDS = float(os.getenv("VOICE_MAX_SECONDS", "60"))
+STT_DECODE_TIMEOUT = float(os.getenv("STT_DECODE_TIMEOUT", "20"))
+
+# after a failed load (no network to fetch the model, missing package) don't retry for this long
+STT_RETRY_AFTER = float(os.getenv("STT_RETRY_AFTER", "300"))
+
+SAMPLE_RATE = 16000
+# decode slightly past the cap so "exactly at the cap" and "cut off" differ
+_OVERRUN_S = 0.25
+
+
+class AudioTooLong(Exception):
+    """Voice message longer than STT_MAX_SECONDS."""
+
+_MODEL = None
+_MODEL_LOCK = threading.Lock()
+_LOAD_FAILED_AT = 0.0
+_STATS_LOCK = threading.Lock()
+_STATS: Dict[str, Any] = {
+    "ok": 0, "empty": 0, "error": 0, "too_long": 0,
+    "audio_s": 0.0, "decode_ms": 0.0, "asr_ms": 0.0, "last_rtf": None,
+}
+
+
+def stt_enabled() -> bool:
+    return STT_ENGINE == "faster_whisper"
+
+
+def get_model():
+    """The whisper model, loaded once per process and kept resident."""
+    global _MODEL, _LOAD_FAILED_AT
+    if _MODEL is None:
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                if _LOAD_FAILED_AT and time.monotonic() - _LOAD_FAILED_AT < STT_RETRY_AFTER:
+                    raise RuntimeError("stt model unavailable")
+                try:
+                    with timed(f"init:stt_model:{STT_MODEL_SIZE}"):
+                        _MODEL = faster_whisper.WhisperModel(
+                            STT_MODEL_SIZE,
+                            device="cpu",
+                            compute_type=STT_COMPUTE_TYPE,
+                            cpu_threads=STT_CPU_THREADS,
+                        )
+                except Exception:
+                    _LOAD_FAILED_AT = time.monotonic()
+                    raise
+    return _MODEL
+
+
+def warm_up() -> None:
+    """Load the model before the first voice turn (first run downloads it)."""
+    if not stt_enabled():
+        return
+    try:
+        get_model()
+    except Exception as e:
+        log.warning("stt: model not loaded (%s); voice turns fall back to a placeholder", e)
+
+
+def ffmpeg_decode_args(source: str = "pipe:0", streaming: bool = False):
+    """
+    ffmpeg command line: `source` → raw mono 16 kHz s16le on stdout, stopping
+    just past STT_MAX_SECONDS (see is_too_long).
+    streaming=True skips input probing and flushes every packet, so PCM comes
+    out while the input is still arriving.
+    """
+    in_opts = {"fflags": "nobuffer", "probesize": 4096, "analyzeduration": 0} if streaming else {}
+    out_opts = {"flush_packets": 1} if streaming else {}
+    return (
+        ffmpeg.input(source, **in_opts)
+        .output("pipe:1", format="s16le", acodec="pcm_s16le", ac=1, ar=SAMPLE_RATE, t=STT_MAX_SECONDS + _OVERRUN_S, **out_opts)
+        .global_args("-hide_banner", "-loglevel", "error")
+        .compile()
+    )
+
+
+def is_too_long(n_samples: int) -> bool:
+    return n_samples > STT_MAX_SECONDS * SAMPLE_RATE
+
+
+def pcm_to_float(pcm: bytes):
+    return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+
+
+def decode_to_pcm(source: Any):
+    """
+    Any container ffmpeg reads (webm/opus, ogg, wav) → mono 16 kHz float32
+    samples in [-1, 1] (at most a little over STT_MAX_SECONDS).
+    source: a path, in-memory audio (bytes / memoryview, written to ffmpeg's
+    stdin) or a real file object (its fd becomes ffmpeg's stdin) — no temp file.
+    """
+    from_path = isinstance(source, str)
+    args = ffmpeg_decode_args(source if from_path else "pipe:0")
+    if from_path:
+        stdin, data = subprocess.DEVNULL, None
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        stdin, data = None, source
+    else:
+        source.seek(0)
+        stdin, data = source, None
+    proc = subprocess.run(
+        args, input=data, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        timeout=STT_DECODE_TIMEOUT, check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg: {proc.stderr.decode(errors='replace').strip()[:200]}")
+    return pcm_to_float(proc.stdout)
+
+
+def transcribe_pcm(samples) -> Dict[str, Any]:
+    """
+    Returns: {"text": str, "audio_s": float, "asr_ms": float, "rtf": float}
+    rtf (real-time factor) = processing time / audio duration; < 1 is faster than real time.
+    """
+    audio_s = len(samples) / SAMPLE_RATE
+    t0 = time.perf_counter()
+    segments, _info = get_model().transcribe(
+        samples,
+        language=STT_LANGUAGE,
+        beam_size=STT_BEAM_SIZE,
+        chunk_length=STT_CHUNK_SECONDS,
+        vad_filter=STT_VAD,
+        condition_on_previous_text=False,
+    )
+    # segments is lazy: decoding happens while we iterate
+    text = " ".join(s.text.strip() for s in segments).strip()
+    asr_ms = (time.perf_counter() - t0) * 1000
+    return {
+        "text": text,
+        "audio_s": round(audio_s, 3),
+        "asr_ms": round(asr_ms, 2),
+        "rtf": round(asr_ms / 1000 / audio_s, 3) if audio_s else None,
+    }
+
+
+def record_result(res: Dict[str, Any]) -> None:
+    """Add one transcribe_file() result to this process's stats."""
+    with _STATS_LOCK:
+        if res.get("too_long"):
+            _STATS["too_long"] += 1
+            return
+        if "audio_s" not in res:
+            _STATS["error"] += 1
+            return
+        _STATS["ok" if res["text"] else "empty"] += 1
+        _STATS["audio_s"] += res["audio_s"]
+        _STATS["decode_ms"] += res["decode_ms"]
+        _STATS["asr_ms"] += res["asr_ms"]
+        _STATS["last_rtf"] = res["rtf"]
+
+
+def transcribe_file(source: Any, record: bool = True, pcm: bool = False) -> Dict[str, Any]:
+    """
+    Decode + transcribe with timings.
+    source: anything decode_to_pcm accepts, or already-decoded s16le bytes with pcm=True.
+    Returns: {"ok": bool, "text": str, "audio_s", "decode_ms", "asr_ms", "rtf", "summary"},
+    or {"ok": False, "too_long": True, ...} without running the model when the
+    audio is longer than STT_MAX_SECONDS.
+    record=False leaves stats to the caller (pool workers report to the parent).
+    """
+    if not stt_enabled():
+        return {"ok": False, "text": "", "summary": "stt_disabled"}
+    try:
+        t0 = time.perf_counter()
+        with span("stt:decode"):
+            samples = pcm_to_float(source) if pcm else decode_to_pcm(source)
+        decode_ms = (time.perf_counter() - t0) * 1000
+        if is_too_long(len(samples)):
+            out = {"ok": False, "text": "", "too_long": True, "summary": "too_long", "max_seconds": STT_MAX_SECONDS}
+            if record:
+                record_result(out)
+            return out
+        with span("stt:asr") as sp:
+            res = transcribe_pcm(samples)
+            sp.set("audio_s", res["audio_s"])
+            sp.set("rtf", res["rtf"])
+    except Exception as e:
+        out = {"ok": False, "text": "", "summary": f"stt_error: {str(e)[:100]}"}
+    else:
+        total_ms = decode_ms + res["asr_ms"]
+        out = {
+            "ok": bool(res["text"]),
+            "text": res["text"],
+            "audio_s": res["audio_s"],
+            "decode_ms": round(decode_ms, 2),
+            "asr_ms": res["asr_ms"],
+            "rtf": round(total_ms / 1000 / res["audio_s"], 3) if res["audio_s"] else None,
+            "summary": "transcribed" if res["text"] else "no_speech",
+        }
+    if record:
+        record_result(out)
+    return out
+
+
 def transcribe_webm(path: str) -> str:
     """
-    TEMP no-op: voice transcription disabled.
-    Returns simple placeholder.
+    Transcript of a recorded voice message, or "[voice message]" when the
+    engine is disabled / unavailable or nothing was said.
+    Runs in the calling process; request handlers go through tools/stt_pool.
     """
-    return "[voice message]"
+    res = transcribe_file(path)
+    return res["text"] or "[voice message]"
+
+
+def stt_stats() -> Dict[str, Any]:
+    with _STATS_LOCK:
+        out = dict(_STATS)
+    audio_s = out["audio_s"]
+    out["rtf"] = round((out["decode_ms"] + out["asr_ms"]) / 1000 / audio_s, 3) if audio_s else None
+    out["audio_s"] = round(audio_s, 3)
+    out["decode_ms"] = round(out["decode_ms"], 2)
+    out["asr_ms"] = round(out["asr_ms"], 2)
+    out.update({
+        "engine": STT_ENGINE,
+        "model": STT_MODEL_SIZE,
+        "compute_type": STT_COMPUTE_TYPE,
+        "loaded": _MODEL is not None,
+    })
+    return out
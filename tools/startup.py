@@ -0,0 +1,109 @@
+# tools/startup.py — single config load, lazy heavy imports, cold-start timing
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+_T0 = time.perf_counter()
+_STEPS: List[Dict[str, Any]] = []
+_STEPS_LOCK = threading.Lock()
+
+
+def _record(step: str, started: float) -> None:
+    with _STEPS_LOCK:
+        _STEPS.append({
+            "step": step,
+            "ms": round((time.perf_counter() - started) * 1000, 2),
+            "at_ms": round((started - _T0) * 1000, 2),
+        })
+
+
+@contextmanager
+def timed(step: str):
+    """Record how long an init step takes in the startup report."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(step, started)
+
+
+_CONFIG_LOADED = False
+_CONFIG_LOCK = threading.Lock()
+
+
+def load_config() -> None:
+    """Read .env into os.environ once per process; later calls are no-ops."""
+    global _CONFIG_LOADED
+    if _CONFIG_LOADED:
+        return
+    with _CONFIG_LOCK:
+        if _CONFIG_LOADED:
+            return
+        with timed("config:load_dotenv"):
+            from dotenv import load_dotenv
+
+            load_dotenv()
+        _CONFIG_LOADED = True
+
+
+class LazyModule:
+    """
+    Stand-in for a heavy module; the real import happens on first attribute
+    access and is timed as 'import:<name>'.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self):
+        mod = self.__dict__["_module"]
+        if mod is None:
+            with self.__dict__["_lock"]:
+                mod = self.__dict__["_module"]
+                if mod is None:
+                    with timed(f"import:{self._name}"):
+                        mod = importlib.import_module(self._name)
+                    self.__dict__["_module"] = mod
+        return mod
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+_LAZY: Dict[str, LazyModule] = {}
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Registry of deferred imports: one LazyModule per module name."""
+    mod = _LAZY.get(name)
+    if mod is None:
+        mod = _LAZY.setdefault(name, LazyModule(name))
+    return mod
+
+
+def startup_report() -> Dict[str, Any]:
+    with _STEPS_LOCK:
+        steps = list(_STEPS)
+    return {
+        "steps": steps,
+        "lazy_modules": {n: m.__dict__["_module"] is not None for n, m in _LAZY.items()},
+    }
+
+
+def format_startup_report() -> str:
+    rep = startup_report()
+    lines = ["startup timing:"]
+    for s in rep["steps"]:
+        lines.append(f"  {s['step']:<40} {s['ms']:>9.2f} ms  (at {s['at_ms']:.0f} ms)")
+    pending = [n for n, loaded in rep["lazy_modules"].items() if not loaded]
+    if pending:
+        lines.append(f"  deferred until first use: {', '.join(pending)}")
+    return "\n".join(lines)
@@ -0,0 +1,141 @@
+# tools/static_assets.py — static asset registry loaded once, reloaded on file change
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .startup import load_config, timed
+
+load_config()
+
+PUBLIC_BASE = os.getenv("PUBLIC_BASE_URL", "").rstrip("/")
+MEDIA_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "media")
+)
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(MEDIA_ROOT, "catalog", "catalog.jpg"))
+# How often (seconds) a registered file is re-stat'ed to notice edits.
+ASSET_CHECK_INTERVAL = float(os.getenv("ASSET_CHECK_INTERVAL", "5"))
+
+_MAGIC = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"%PDF", "application/pdf"),
+]
+
+# name → {"path", "public_path", "info": dict | None, "stat": (mtime_ns, size) | None, "checked": float}
+_ASSETS: Dict[str, Dict[str, Any]] = {}
+_LOCK = threading.Lock()
+_STATS = {"lookups": 0, "reloads": 0}
+
+
+def _public_path(path: str) -> str:
+    """Path under /media/: relative to media/ when inside it, else just the file name."""
+    ap = os.path.abspath(path)
+    if os.path.commonpath([MEDIA_ROOT, ap]) == MEDIA_ROOT:
+        return os.path.relpath(ap, MEDIA_ROOT).replace(os.sep, "/")
+    return os.path.basename(ap)
+
+
+def _sniff_mime(head: bytes, path: str) -> str:
+    # trust the bytes over the extension (media/catalog/catalog.jpg is a PNG)
+    for magic, mime in _MAGIC:
+        if head.startswith(magic):
+            return mime
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def _load(name: str, path: str, public_path: str, st: os.stat_result) -> Dict[str, Any]:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        head = f.read(16)
+        h.update(head)
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    version = digest[:12]
+    url = f"{PUBLIC_BASE}/media/{public_path}?v={version}"
+    return {
+        "name": name,
+        "path": path,
+        "public_path": public_path,
+        "size": st.st_size,
+        "hash": digest,
+        "etag": digest[:32],
+        "version": version,
+        "mime": _sniff_mime(head, path),
+        "url": url,
+    }
+
+
+def _refresh(entry: Dict[str, Any], name: str, now: float) -> None:
+    entry["checked"] = now
+    try:
+        st = os.stat(entry["path"])
+    except OSError:
+        entry["info"], entry["stat"] = None, None
+        return
+    key = (st.st_mtime_ns, st.st_size)
+    if entry["info"] is not None and entry["stat"] == key:
+        return
+    entry["info"] = _load(name, entry["path"], entry["public_path"], st)
+    entry["stat"] = key
+    _STATS["reloads"] += 1
+
+
+def register_asset(name: str, path: str, public_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Register (or re-point) an asset and load its metadata now. Returns the info dict or None if missing."""
+    path = os.path.abspath(path)
+    with _LOCK:
+        entry = {
+            "path": path,
+            "public_path": public_path or _public_path(path),
+            "info": None,
+            "stat": None,
+            "checked": 0.0,
+        }
+        _ASSETS[name] = entry
+        _refresh(entry, name, time.monotonic())
+        return entry["info"]
+
+
+def get_asset(name: str) -> Optional[Dict[str, Any]]:
+    """
+    Memory lookup; the file is only re-stat'ed every ASSET_CHECK_INTERVAL
+    seconds and re-hashed when its mtime/size changed.
+    """
+    now = time.monotonic()
+    with _LOCK:
+        _STATS["lookups"] += 1
+        entry = _ASSETS.get(name)
+        if entry is None:
+            return None
+        if now - entry["checked"] >= ASSET_CHECK_INTERVAL:
+            _refresh(entry, name, now)
+        return entry["info"]
+
+
+def find_by_public_path(public_path: str) -> Optional[Dict[str, Any]]:
+    public_path = public_path.lstrip("/")
+    with _LOCK:
+        names = [n for n, e in _ASSETS.items() if e["public_path"] == public_path]
+    return get_asset(names[0]) if names else None
+
+
+def asset_stats() -> Dict[str, Any]:
+    with _LOCK:
+        out: Dict[str, Any] = dict(_STATS)
+        out["assets"] = {
+            n: ({k: e["info"][k] for k in ("public_path", "size", "mime", "version")} if e["info"] else None)
+            for n, e in _ASSETS.items()
+        }
+    return out
+
+
+# built-in assets: size/hash/mime/versioned URL computed once here; later lookups are memory-only
+with timed("init:asset:catalog"):
+    register_asset("catalog", CATALOG_PATH)
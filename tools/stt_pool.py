@@ -0,0 +1,292 @@
+# tools/stt_pool.py — transcription on worker processes, off the request threads
+import atexit
+import itertools
+import math
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from .startup import load_config
+from .speech_to_text import stt_enabled, transcribe_file, record_result, warm_up as _load_model
+from .audio_ingest import audio_bytes
+
+load_config()
+
+# Worker processes per web worker; 0 runs transcription inline (dev / tests).
+STT_WORKERS = int(os.getenv("STT_WORKERS", "1"))
+# Jobs allowed to wait behind the busy workers before /api/voice gets a 503.
+STT_QUEUE_MAX = int(os.getenv("STT_QUEUE_MAX", "4"))
+STT_JOB_TIMEOUT = float(os.getenv("STT_JOB_TIMEOUT", "30"))
+# A job still running this long past STT_JOB_TIMEOUT has its worker killed (see _worker_job).
+STT_KILL_GRACE = int(os.getenv("STT_KILL_GRACE", "5"))
+# Backstop for the caller's wait: every job ahead of it and its own hitting the deadline.
+# The real per-job deadline is the worker's alarm, counted from when the job starts.
+_WAIT_LIMIT = (STT_JOB_TIMEOUT + STT_KILL_GRACE) * (STT_QUEUE_MAX + 2)
+
+
+class SttBusy(Exception):
+    """All workers busy and the wait queue is full."""
+
+
+# running + waiting jobs; a slot is returned only when the worker is really done
+_SLOTS = threading.BoundedSemaphore(max(1, STT_WORKERS) + STT_QUEUE_MAX)
+# streaming previews: one at a time, never queued, never counted against _SLOTS
+_PARTIAL_SLOT = threading.BoundedSemaphore(1)
+_LOCK = threading.Lock()
+_POOL = None
+# shared with the pool's workers: per worker, the job it is running (0 = none) and since when
+_RUNNING = None
+_JOB_IDS = itertools.count(1)
+_STATS: Dict[str, Any] = {
+    "submitted": 0, "completed": 0, "rejected": 0, "timeouts": 0, "errors": 0, "recycled": 0,
+    "inflight": 0, "max_inflight": 0,
+    "service_ms": 0.0, "max_service_ms": 0.0, "wait_ms": 0.0,
+}
+
+
+# in a worker process: its index into _RUNNING
+_WORKER_INDEX = None
+
+
+def _init_worker(running, counter) -> None:
+    global _RUNNING, _WORKER_INDEX
+    with counter.get_lock():
+        _WORKER_INDEX = counter.value
+        counter.value += 1
+    _RUNNING = running
+    _load_model()
+
+
+def _worker_job(source: Any, pcm: bool = False, job: int = 0) -> Dict[str, Any]:
+    # runs in the child: model is already resident (pool initializer).
+    # The deadline starts with the job, not when it was queued. A decode/ASR
+    # stuck in native code never gets back to Python, so it is SIGALRM with the
+    # default action: the kernel kills this worker, the parent sees
+    # BrokenProcessPool, finds this job in _RUNNING past its deadline and
+    # resubmits the others that were on the pool.
+    if _RUNNING is not None:
+        ids, since = _RUNNING
+        ids[_WORKER_INDEX], since[_WORKER_INDEX] = job, time.time()
+    if hasattr(signal, "alarm"):
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+        signal.alarm(int(math.ceil(STT_JOB_TIMEOUT)) + STT_KILL_GRACE)
+    t0 = time.perf_counter()
+    try:
+        res = transcribe_file(source, record=False, pcm=pcm)
+    finally:
+        if hasattr(signal, "alarm"):
+            signal.alarm(0)
+        if _RUNNING is not None:
+            _RUNNING[0][_WORKER_INDEX] = 0
+    res["service_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    res["worker_pid"] = os.getpid()
+    return res
+
+
+def _noop() -> int:
+    return os.getpid()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        with _LOCK:
+            if _POOL is None:
+                # spawn: never fork a process that already runs threads (gthread, outbox)
+                ctx = multiprocessing.get_context("spawn")
+                running = (ctx.Array("q", STT_WORKERS, lock=False), ctx.Array("d", STT_WORKERS, lock=False))
+                _POOL = ProcessPoolExecutor(
+                    max_workers=STT_WORKERS,
+                    mp_context=ctx,
+                    initializer=_init_worker,
+                    initargs=(running, ctx.Value("i", 0)),
+                )
+                _POOL._running = running
+    return _POOL
+
+
+def _reset_pool(broken: ProcessPoolExecutor) -> None:
+    # jobs already queued on the old pool still run there (or, if it is broken,
+    # come back as BrokenProcessPool and are resubmitted by their callers)
+    global _POOL
+    with _LOCK:
+        if _POOL is broken:
+            _POOL = None
+    broken.shutdown(wait=False)
+
+
+def _hit_deadline(pool: ProcessPoolExecutor, job: int) -> bool:
+    """Was `job` the one running past its deadline when `pool` broke?"""
+    ids, since = pool._running
+    return any(ids[i] == job and time.time() - since[i] >= STT_JOB_TIMEOUT for i in range(len(ids)))
+
+
+def start_stt_pool() -> None:
+    """Spawn the workers and load their models now instead of on the first voice turn."""
+    if STT_WORKERS <= 0 or not stt_enabled():
+        if stt_enabled():
+            _load_model()
+        return
+    pool = _get_pool()
+    for f in [pool.submit(_noop) for _ in range(STT_WORKERS)]:
+        try:
+            f.result()
+        except Exception:
+            pass
+
+
+def stop_stt_pool() -> None:
+    global _POOL
+    with _LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(stop_stt_pool)
+
+
+def _on_done(future) -> None:
+    with _LOCK:
+        _STATS["inflight"] -= 1
+        if future.cancelled() or future.exception() is not None:
+            return
+        res = future.result()
+        _STATS["completed"] += 1
+        _STATS["service_ms"] += res.get("service_ms", 0.0)
+        _STATS["max_service_ms"] = max(_STATS["max_service_ms"], res.get("service_ms", 0.0))
+    if not getattr(future, "_partial", False):
+        record_result(res)
+
+
+def transcribe_audio(source: Any, pcm: bool = False, partial: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Transcribe on the worker pool; the calling thread only waits.
+    source: a path or an upload from tools/audio_ingest.open_upload
+    (in-memory uploads go to the worker as bytes, spilled ones as their path).
+    pcm=True: source is decoded s16le bytes (tools/voice_stream).
+    Raises SttBusy when saturated. Timeouts and worker crashes come back as
+    {"ok": False, "text": "", "summary": ...} so the turn can continue.
+    partial=True is best-effort and low priority (streaming previews): it only
+    runs when a worker is idle, so it never waits behind or takes a queue slot
+    from a final transcription; otherwise returns None. Left out of the stt stats.
+    """
+    if STT_WORKERS <= 0 or not stt_enabled():
+        return transcribe_file(source, record=not partial, pcm=pcm)
+
+    if partial:
+        slot = _PARTIAL_SLOT
+        if not slot.acquire(blocking=False):
+            return None
+        with _LOCK:
+            idle = _STATS["inflight"] < STT_WORKERS
+        if not idle:
+            slot.release()
+            return None
+    else:
+        slot = _SLOTS
+        if not slot.acquire(blocking=False):
+            with _LOCK:
+                _STATS["rejected"] += 1
+            raise SttBusy()
+
+    t0 = time.perf_counter()
+    try:
+        data = audio_bytes(source)
+    except Exception as e:
+        slot.release()
+        with _LOCK:
+            _STATS["errors"] += 1
+        return {"ok": False, "text": "", "summary": f"stt_error: {str(e)[:100]}"}
+    res = _run_job(data, pcm, next(_JOB_IDS), partial, slot)
+    if "service_ms" in res:
+        with _LOCK:
+            _STATS["wait_ms"] += max(0.0, (time.perf_counter() - t0) * 1000 - res["service_ms"])
+    return res
+
+
+def _run_job(data: Any, pcm: bool, job: int, partial: bool, slot) -> Dict[str, Any]:
+    """Submit and wait; `slot` is released once no worker is busy with the job."""
+    for _ in range(2):
+        pool = None
+        try:
+            pool = _get_pool()
+            future = pool.submit(_worker_job, data, pcm, job)
+        except Exception:
+            slot.release()
+            if pool is not None:
+                _reset_pool(pool)
+            with _LOCK:
+                _STATS["errors"] += 1
+            return {"ok": False, "text": "", "summary": "stt_pool_unavailable"}
+        with _LOCK:
+            _STATS["submitted"] += 1
+            _STATS["inflight"] += 1
+            _STATS["max_inflight"] = max(_STATS["max_inflight"], _STATS["inflight"])
+        future._partial = partial
+        future.add_done_callback(_on_done)
+
+        try:
+            res = future.result(timeout=_WAIT_LIMIT)
+        except FutureTimeout:
+            # only without SIGALRM (or if it failed): new jobs go to a fresh pool,
+            # the old one keeps its queue and the slot waits for the job to end
+            _reset_pool(pool)
+            future.add_done_callback(lambda f: slot.release())
+            with _LOCK:
+                _STATS["timeouts"] += 1
+                _STATS["recycled"] += 1
+            return {"ok": False, "text": "", "summary": "stt_timeout"}
+        except BrokenProcessPool:
+            _reset_pool(pool)
+            if _hit_deadline(pool, job):
+                slot.release()
+                with _LOCK:
+                    _STATS["timeouts"] += 1
+                    _STATS["recycled"] += 1
+                return {"ok": False, "text": "", "summary": "stt_timeout"}
+            # another job's worker died and took the pool with it: run this one again
+            continue
+        except Exception as e:
+            slot.release()
+            with _LOCK:
+                _STATS["errors"] += 1
+            return {"ok": False, "text": "", "summary": f"stt_error: {str(e)[:100]}"}
+        slot.release()
+        return res
+
+    slot.release()
+    with _LOCK:
+        _STATS["errors"] += 1
+    return {"ok": False, "text": "", "summary": "stt_worker_crashed"}
+
+
+def stt_pool_stats() -> Dict[str, Any]:
+    with _LOCK:
+        st = dict(_STATS)
+        started = _POOL is not None
+    done = st["completed"] or 1
+    running = min(st["inflight"], max(1, STT_WORKERS))
+    return {
+        "workers": STT_WORKERS,
+        "started": started,
+        "queue_max": STT_QUEUE_MAX,
+        "queue_depth": st["inflight"] - running,
+        "inflight": st["inflight"],
+        "max_inflight": st["max_inflight"],
+        "submitted": st["submitted"],
+        "completed": st["completed"],
+        "rejected": st["rejected"],
+        "timeouts": st["timeouts"],
+        "errors": st["errors"],
+        "recycled": st["recycled"],
+        "avg_service_ms": round(st["service_ms"] / done, 2),
+        "max_service_ms": round(st["max_service_ms"], 2),
+        "avg_wait_ms": round(st["wait_ms"] / done, 2),
+        "job_timeout_s": STT_JOB_TIMEOUT,
+    }
@@ -0,0 +1,368 @@
+# tools/text_to_speech.py — offline reply audio (piper CLI) with a content-hashed disk cache
+import hashlib
+import itertools
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .startup import load_config
+from .tracing import span
+
+load_config()
+log = logging.getLogger(__name__)
+
+PUBLIC_BASE = os.getenv("PUBLIC_BASE_URL", "").rstrip("/")
+
+# piper | espeak | none  (none keeps browser speechSynthesis on the frontend)
+TTS_ENGINE = os.getenv("TTS_ENGINE", "piper").strip().lower()
+TTS_PIPER_BIN = os.getenv("TTS_PIPER_BIN", "piper")
+# piper voice: a .onnx model path (its .onnx.json next to it) or a voice name piper can find
+TTS_VOICE = os.getenv("TTS_VOICE", "en_US-lessac-medium")
+# used when piper or its voice is missing; empty disables the fallback
+TTS_FALLBACK_BIN = os.getenv("TTS_FALLBACK_BIN", "espeak-ng")
+TTS_FALLBACK_VOICE = os.getenv("TTS_FALLBACK_VOICE", "en")
+TTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT", "8"))
+# longer replies (confirmation summaries) are left to the browser
+TTS_MAX_CHARS = int(os.getenv("TTS_MAX_CHARS", "600"))
+# least recently used files are deleted above this
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "200"))
+# background synthesis threads / jobs waiting for them (past that, the first GET synthesizes)
+TTS_THREADS = int(os.getenv("TTS_THREADS", "1"))
+TTS_QUEUE_MAX = int(os.getenv("TTS_QUEUE_MAX", "16"))
+# text of a URL handed out but not synthesized yet, kept as <key>.txt next to the
+# audio (any web worker may get the GET); removed once synthesized or after this long
+TTS_PENDING_TTL = float(os.getenv("TTS_PENDING_TTL", "600"))
+_PENDING_SWEEP_EVERY = 50
+
+TTS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "media", "tts"
+)
+os.makedirs(TTS_DIR, exist_ok=True)
+
+_WS = re.compile(r"\s+")
+_AUDIO_NAME = re.compile(r"^[0-9a-f]{32}\.wav$")
+
+_LOCK = threading.Lock()
+# cache key → lock, so concurrent turns with the same reply synthesize it once
+_INFLIGHT: Dict[str, threading.Lock] = {}
+_ENGINE: Optional[Dict[str, Any]] = None
+_pending_writes = itertools.count(1)
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_DISK_BYTES: Optional[int] = None
+_STATS: Dict[str, Any] = {
+    "hits": 0, "synthesized": 0, "errors": 0, "skipped": 0, "evicted": 0, "queued": 0,
+    "synth_ms": 0.0, "max_synth_ms": 0.0,
+}
+
+
+def tts_enabled() -> bool:
+    return TTS_ENGINE in ("piper", "espeak")
+
+
+def _engine() -> Optional[Dict[str, Any]]:
+    """First available engine: {"name", "voice", "args"} or None (resolved once per process)."""
+    global _ENGINE
+    if _ENGINE is None:
+        candidates = []
+        if TTS_ENGINE == "piper":
+            candidates.append(("piper", TTS_PIPER_BIN, TTS_VOICE,
+                               ["--model", TTS_VOICE, "--output_file"]))
+        espeak_bin = TTS_FALLBACK_BIN or ("espeak-ng" if TTS_ENGINE == "espeak" else "")
+        if espeak_bin:
+            candidates.append(("espeak", espeak_bin, TTS_FALLBACK_VOICE,
+                               ["--stdin", "-v", TTS_FALLBACK_VOICE, "-w"]))
+        found = {}
+        for name, binary, voice, args in candidates:
+            path = shutil.which(binary)
+            if path and (name != "piper" or not TTS_VOICE.endswith(".onnx") or os.path.isfile(TTS_VOICE)):
+                found = {"name": name, "voice": voice, "args": [path] + args}
+                break
+        if not found:
+            log.warning("tts: no engine available; replies fall back to browser speech")
+        _ENGINE = found
+    return _ENGINE or None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(max_workers=max(1, TTS_THREADS), thread_name_prefix="tts")
+    return _EXECUTOR
+
+
+def normalize_text(text: str) -> str:
+    return _WS.sub(" ", text or "").strip()
+
+
+def cache_key(text: str, voice: str) -> str:
+    return hashlib.sha256(f"{voice}\n{normalize_text(text)}".encode("utf-8")).hexdigest()[:32]
+
+
+def _public_url(filename: str) -> str:
+    # same shape as QR links: absolute when PUBLIC_BASE_URL is set
+    return f"{PUBLIC_BASE}/media/tts/{filename}"
+
+
+def _run_engine(eng: Dict[str, Any], text: str, out_path: str) -> None:
+    proc = subprocess.run(
+        eng["args"] + [out_path],
+        input=text.encode("utf-8"),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        timeout=TTS_TIMEOUT,
+        check=False,
+    )
+    if proc.returncode != 0 or not os.path.isfile(out_path) or os.path.getsize(out_path) <= 44:
+        raise RuntimeError(f"{eng['name']}: {proc.stderr.decode(errors='replace').strip()[:200]}")
+
+
+def _scan_dir():
+    entries = []
+    for e in os.scandir(TTS_DIR):
+        if e.is_file() and e.name.endswith(".wav"):
+            st = e.stat()
+            entries.append((st.st_mtime, st.st_size, e.path))
+    return entries
+
+
+def _account(added: int) -> None:
+    """Track cache size; evict least recently used files (oldest mtime) over TTS_CACHE_MAX_MB."""
+    global _DISK_BYTES
+    limit = int(TTS_CACHE_MAX_MB * 1024 * 1024)
+    with _LOCK:
+        if _DISK_BYTES is None:
+            _DISK_BYTES = sum(size for _, size, _ in _scan_dir())
+        else:
+            _DISK_BYTES += added
+        if _DISK_BYTES <= limit:
+            return
+        # rescan: other web workers share the directory
+        entries = sorted(_scan_dir())
+        total = sum(size for _, size, _ in entries)
+        target = int(limit * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            _STATS["evicted"] += 1
+        _DISK_BYTES = total
+
+
+def _pending_path(filename: str) -> str:
+    return os.path.join(TTS_DIR, filename[:-len(".wav")] + ".txt")
+
+
+def _write_pending(filename: str, text: str) -> None:
+    path = _pending_path(filename)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except OSError as e:
+        log.warning("tts: could not store pending text (%s)", e)
+    if next(_pending_writes) % _PENDING_SWEEP_EVERY == 0:
+        _sweep_pending()
+
+
+def _read_pending(filename: str) -> Optional[str]:
+    path = _pending_path(filename)
+    try:
+        if time.time() - os.path.getmtime(path) > TTS_PENDING_TTL:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _drop_pending(filename: str) -> None:
+    try:
+        os.remove(_pending_path(filename))
+    except OSError:
+        pass
+
+
+def _sweep_pending() -> None:
+    """Delete pending texts older than TTS_PENDING_TTL (synthesis failed or was never asked for)."""
+    now = time.time()
+    for e in os.scandir(TTS_DIR):
+        try:
+            if e.name.endswith(".txt") and now - e.stat().st_mtime > TTS_PENDING_TTL:
+                os.remove(e.path)
+        except OSError:
+            continue
+
+
+def _prepare(text: str) -> Optional[Tuple[Dict[str, Any], str, str]]:
+    """(engine, normalized text, file name) or None when this text gets no server audio."""
+    text = normalize_text(text)
+    if not tts_enabled() or not text:
+        return None
+    if len(text) > TTS_MAX_CHARS:
+        with _LOCK:
+            _STATS["skipped"] += 1
+        return None
+    eng = _engine()
+    if eng is None:
+        return None
+    return eng, text, f"{cache_key(text, eng['name'] + ':' + eng['voice'])}.wav"
+
+
+def _synthesize_file(eng: Dict[str, Any], text: str, filename: str) -> bool:
+    """Make sure TTS_DIR/filename exists; concurrent callers for one file wait for a single synthesis."""
+    path = os.path.join(TTS_DIR, filename)
+    with span("tts:synthesize") as sp:
+        if _touch(path):
+            sp.set("outcome", "cached")
+            return True
+        with _LOCK:
+            key_lock = _INFLIGHT.setdefault(filename, threading.Lock())
+        with key_lock:
+            try:
+                if os.path.isfile(path):
+                    # made by the caller we waited for
+                    sp.set("outcome", "cached")
+                    return True
+                t0 = time.perf_counter()
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.wav"
+                try:
+                    _run_engine(eng, text, tmp)
+                    os.replace(tmp, path)
+                    _drop_pending(filename)
+                except Exception as e:
+                    with _LOCK:
+                        _STATS["errors"] += 1
+                    sp.set("outcome", "error")
+                    log.warning("tts: synthesis failed (%s)", str(e)[:200])
+                    return False
+                finally:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+            finally:
+                # dropped only once the file is in place (or failed), still under key_lock
+                with _LOCK:
+                    _INFLIGHT.pop(filename, None)
+        ms = (time.perf_counter() - t0) * 1000
+        with _LOCK:
+            _STATS["synthesized"] += 1
+            _STATS["synth_ms"] += ms
+            _STATS["max_synth_ms"] = max(_STATS["max_synth_ms"], ms)
+        sp.set("outcome", "synthesized")
+    _account(os.path.getsize(path))
+    return True
+
+
+def _background(eng: Dict[str, Any], text: str, filename: str) -> None:
+    try:
+        _synthesize_file(eng, text, filename)
+    finally:
+        with _LOCK:
+            _STATS["queued"] -= 1
+
+
+def reply_audio_url(text: str) -> Optional[str]:
+    """
+    URL of the spoken reply, returned at once (no synthesis on the request thread).
+    The name is a hash of (voice, text): a cached file is just touched (the one
+    place a cache hit is counted); otherwise the text is stored next to the cache
+    and the audio is made on the TTS thread, or by ensure_audio() when the browser
+    asks for it first. None when the text gets no server audio (engine off,
+    too long) — the frontend then uses browser speech.
+    """
+    prep = _prepare(text)
+    if prep is None:
+        return None
+    eng, text, filename = prep
+    if _touch(os.path.join(TTS_DIR, filename)):
+        with _LOCK:
+            _STATS["hits"] += 1
+        return _public_url(filename)
+    _write_pending(filename, text)
+    with _LOCK:
+        schedule = _STATS["queued"] < TTS_QUEUE_MAX
+        if schedule:
+            _STATS["queued"] += 1
+    if schedule:
+        _get_executor().submit(_background, eng, text, filename)
+    return _public_url(filename)
+
+
+def ensure_audio(filename: str) -> Optional[str]:
+    """
+    Path of a reply's audio for the media route, synthesizing it now from the
+    stored text if it isn't ready yet (works on any web worker).
+    """
+    filename = os.path.basename(filename)
+    if not _AUDIO_NAME.match(filename):
+        return None
+    path = os.path.join(TTS_DIR, filename)
+    if os.path.isfile(path):
+        return path
+    text = _read_pending(filename)
+    prep = _prepare(text) if text is not None else None
+    # the name must still match this worker's engine and voice
+    if prep is None or prep[2] != filename or not _synthesize_file(*prep):
+        return None
+    return path
+
+
+def synthesize(text: str) -> Optional[str]:
+    """Synthesize now (blocking) and return the URL, or None; for warm-up, not request threads."""
+    prep = _prepare(text)
+    if prep is None:
+        return None
+    eng, text, filename = prep
+    return _public_url(filename) if _synthesize_file(eng, text, filename) else None
+
+
+def _touch(path: str) -> bool:
+    """Bump a cached file's mtime so eviction sees it as recently used; False if missing."""
+    try:
+        os.utime(path, None)
+    except OSError:
+        return False
+    return True
+
+
+def presynthesize(texts: Iterable[str]) -> int:
+    """Fill the cache for fixed replies so they are hits from the first turn. Returns how many are ready."""
+    if not tts_enabled() or _engine() is None:
+        return 0
+    return sum(1 for t in texts if synthesize(t))
+
+
+def tts_stats() -> Dict[str, Any]:
+    with _LOCK:
+        st = dict(_STATS)
+        disk = _DISK_BYTES
+    done = st["synthesized"] or 1
+    lookups = st["hits"] + st["synthesized"]
+    eng = _ENGINE or {}
+    return {
+        "engine": eng.get("name") if _ENGINE is not None else TTS_ENGINE,
+        "voice": eng.get("voice"),
+        "hits": st["hits"],
+        "synthesized": st["synthesized"],
+        "hit_rate": round(st["hits"] / lookups, 3) if lookups else None,
+        "errors": st["errors"],
+        "skipped_too_long": st["skipped"],
+        "evicted": st["evicted"],
+        "queued": st["queued"],
+        "avg_synth_ms": round(st["synth_ms"] / done, 2),
+        "max_synth_ms": round(st["max_synth_ms"], 2),
+        "disk_bytes": disk,
+        "disk_max_bytes": int(TTS_CACHE_MAX_MB * 1024 * 1024),
+    }
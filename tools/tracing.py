@@ -0,0 +1,217 @@
+# tools/tracing.py — context-local span tracing for a turn (off by default)
+import collections
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from .startup import load_config
+
+load_config()
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "0") == "1"
+# ring | jsonl | both
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "ring").strip().lower()
+TRACE_RING_SIZE = int(os.getenv("TRACE_RING_SIZE", "200"))
+TRACE_JSONL_PATH = os.getenv(
+    "TRACE_JSONL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces.jsonl"),
+)
+
+_CURRENT: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+
+_RING: collections.deque = collections.deque(maxlen=TRACE_RING_SIZE)
+_LOCK = threading.Lock()
+# span name → {"count", "total_ms", "max_ms"} over every finished trace
+_AGG: Dict[str, Dict[str, float]] = {}
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class Trace:
+    __slots__ = ("trace_id", "name", "attrs", "spans", "_t0", "_depth", "_ts")
+
+    def __init__(self, name: str, trace_id: Optional[str] = None, **attrs):
+        self.trace_id = trace_id or new_trace_id()
+        self.name = name
+        self.attrs = attrs
+        self.spans: List[Dict[str, Any]] = []
+        self._ts = time.time()
+        self._t0 = time.perf_counter()
+        self._depth = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "ts": round(self._ts, 3),
+            "ms": round((time.perf_counter() - self._t0) * 1000, 3),
+            "attrs": self.attrs,
+            "spans": self.spans,
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "record", "_t")
+
+    def __init__(self, trace: Trace, name: str, attrs: Dict[str, Any]):
+        self.trace = trace
+        self.record = {"name": name, "depth": trace._depth}
+        if attrs:
+            self.record.update(attrs)
+
+    def set(self, key: str, value: Any) -> None:
+        self.record[key] = value
+
+    def __enter__(self):
+        tr = self.trace
+        self._t = time.perf_counter()
+        self.record["start_ms"] = round((self._t - tr._t0) * 1000, 3)
+        tr._depth += 1
+        # appended on enter so spans stay in start order
+        tr.spans.append(self.record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.trace._depth -= 1
+        self.record["ms"] = round((time.perf_counter() - self._t) * 1000, 3)
+        if exc_type is not None:
+            self.record["error"] = exc_type.__name__
+        return False
+
+
+class _NullSpan:
+    """Returned when no trace is active: enter/exit/set do nothing."""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, **attrs):
+    """
+    with span("db:save_booking"): ...
+    Costs one contextvar lookup when tracing is off or no trace is active.
+    """
+    tr = _CURRENT.get()
+    if tr is None:
+        return _NULL_SPAN
+    return _Span(tr, name, attrs)
+
+
+def traced(name: str):
+    """Decorator form of span() for tool functions."""
+
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tr = _CURRENT.get()
+            if tr is None:
+                return fn(*args, **kwargs)
+            with _Span(tr, name, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+def current_trace_id() -> Optional[str]:
+    tr = _CURRENT.get()
+    return tr.trace_id if tr is not None else None
+
+
+class start_trace:
+    """
+    with start_trace("api:text", trace_id=tid) as tr: ...
+    Binds a Trace to the current context and exports it on exit.
+    Yields None (and records nothing) when TRACE_ENABLED is off.
+    """
+
+    __slots__ = ("_trace", "_token")
+
+    def __init__(self, name: str, trace_id: Optional[str] = None, **attrs):
+        self._trace = Trace(name, trace_id, **attrs) if TRACE_ENABLED else None
+        self._token = None
+
+    def __enter__(self) -> Optional[Trace]:
+        if self._trace is not None:
+            self._token = _CURRENT.set(self._trace)
+        return self._trace
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._trace is None:
+            return False
+        _CURRENT.reset(self._token)
+        if exc_type is not None:
+            self._trace.attrs["error"] = exc_type.__name__
+        _export(self._trace.to_dict())
+        return False
+
+
+def _export(rec: Dict[str, Any]) -> None:
+    with _LOCK:
+        for s in rec["spans"]:
+            if "ms" not in s:
+                continue
+            agg = _AGG.get(s["name"])
+            if agg is None:
+                agg = _AGG[s["name"]] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            agg["count"] += 1
+            agg["total_ms"] += s["ms"]
+            agg["max_ms"] = max(agg["max_ms"], s["ms"])
+        if TRACE_EXPORT in ("ring", "both"):
+            _RING.append(rec)
+        if TRACE_EXPORT in ("jsonl", "both"):
+            try:
+                with open(TRACE_JSONL_PATH, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            except OSError:
+                pass
+
+
+def recent_traces(limit: int = 50) -> List[Dict[str, Any]]:
+    with _LOCK:
+        items = list(_RING)
+    return items[-limit:][::-1]
+
+
+def get_trace(trace_id: str) -> Optional[Dict[str, Any]]:
+    with _LOCK:
+        for rec in reversed(_RING):
+            if rec["trace_id"] == trace_id:
+                return rec
+    return None
+
+
+def trace_stats() -> Dict[str, Any]:
+    """Per-span totals, slowest total first — where a turn's time goes."""
+    with _LOCK:
+        rows = sorted(_AGG.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+        spans = {
+            name: {
+                "count": int(a["count"]),
+                "avg_ms": round(a["total_ms"] / a["count"], 3),
+                "max_ms": round(a["max_ms"], 3),
+                "total_ms": round(a["total_ms"], 3),
+            }
+            for name, a in rows
+        }
+        buffered = len(_RING)
+    return {"enabled": TRACE_ENABLED, "export": TRACE_EXPORT, "buffered": buffered, "spans": spans}
@@ -0,0 +1,95 @@
+# tools/ttl_cache.py — size-bounded, thread-safe LRU cache with per-entry TTL
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    LRU cache bounded by maxsize; entries expire ttl seconds after they are set.
+
+    Expiry is amortized: expired entries are dropped when read, and every
+    `sweep_every` writes a full sweep removes whatever nobody read again,
+    so memory stays bounded by live data rather than by history.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, sweep_every: Optional[int] = None):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self.sweep_every = sweep_every or max(64, self.maxsize // 8)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self._misses += 1
+                return default
+            expires, value = item
+            if expires <= now:
+                del self._data[key]
+                self._expirations += 1
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (now + self.ttl, value)
+            self._data.move_to_end(key)
+            self._writes += 1
+            if self._writes % self.sweep_every == 0:
+                self._purge_locked(now)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[1]
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._purge_locked(time.monotonic())
+
+    def _purge_locked(self, now: float) -> int:
+        dead = [k for k, (expires, _) in self._data.items() if expires <= now]
+        for k in dead:
+            del self._data[k]
+        self._expirations += len(dead)
+        return len(dead)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 3) if total else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
@@ -1,4 +1,76 @@
-import dateparser
+import os
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+from .startup import lazy_import
+
+# locale data makes this one of the slowest imports; defer to first parse / warm_up
+dateparser = lazy_import("dateparser")
+
+# Restricting languages skips dateparser's language detection on every call.
+DATEPARSER_LANGUAGES = [
+    x.strip() for x in os.getenv("DATEPARSER_LANGUAGES", "en").split(",") if x.strip()
+]
+# Order for ambiguous numeric dates like "12/11" (dateparser's default for English).
+DATE_ORDER = os.getenv("DATE_ORDER", "MDY").upper()
+DATEPARSER_SETTINGS = {"DATE_ORDER": DATE_ORDER}
+
+_MONTHS = {
+    m: i for i, m in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1
+    )
+}
+
+# The shapes tools/slot_extractor produces: "25 Oct" / "12/11" / "12/11/2025" + "7 pm" / "19:30"
+_FAST_RE = re.compile(
+    r"^(?:(?P<day>\d{1,2})\s+(?P<mon>[a-z]{3})[a-z]*\.?"
+    r"|(?P<a>\d{1,2})/(?P<b>\d{1,2})(?:/(?P<year>\d{2,4}))?)"
+    r"\s+(?:at\s+)?(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s?(?P<ampm>am|pm)?$"
+)
+
+
+def _fast_parse(s: str, today: date):
+    m = _FAST_RE.match(s)
+    if not m:
+        return None
+    if m.group("day"):
+        month = _MONTHS.get(m.group("mon"))
+        if not month:
+            return None
+        day, year = int(m.group("day")), today.year
+    else:
+        a, b = int(m.group("a")), int(m.group("b"))
+        month, day = (a, b) if DATE_ORDER.startswith("M") else (b, a)
+        year = int(m.group("year")) if m.group("year") else today.year
+        if year < 100:
+            year += 2000
+
+    hour, minute = int(m.group("hour")), int(m.group("minute") or 0)
+    ampm = m.group("ampm")
+    if ampm:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if ampm == "pm" else 0)
+    try:
+        return datetime(year, month, day, hour, minute)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=1024)
+def _parse_cached(normalized: str, today: date):
+    # today is part of the key so "tomorrow 7pm" is never served from yesterday
+    dt = _fast_parse(normalized, today)
+    if dt is None:
+        dt = dateparser.parse(normalized, languages=DATEPARSER_LANGUAGES, settings=DATEPARSER_SETTINGS)
+    return dt
+
+
+def warm_up():
+    """Load dateparser's locale data before the first booking hits it."""
+    dateparser.parse("tomorrow at 7pm", languages=DATEPARSER_LANGUAGES, settings=DATEPARSER_SETTINGS)
+
 
 def validate_datetime(nl_string: str) -> dict:
     """
@@ -8,12 +80,15 @@ def validate_datetime(nl_string: str) -> dict:
     - "25 Oct 6pm"
     - "next monday 3pm"
     - "today evening"
+    Common slot shapes ("25 Oct 7 pm", "12/11 19:30") skip dateparser;
+    results are memoized per normalized string and day.
     """
 
     if not nl_string or not isinstance(nl_string, str):
         return {"ok": False, "text": "Couldn't read date/time."}
 
-    dt = dateparser.parse(nl_string)
+    normalized = " ".join(nl_string.lower().split())
+    dt = _parse_cached(normalized, date.today())
 
     if not dt:
         return {"ok": False, "text": "Sorry, couldn't understand that date/time."}
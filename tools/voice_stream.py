@@ -0,0 +1,183 @@
+# tools/voice_stream.py — streamed voice: incremental decode, partial transcripts, endpointing
+import os
+import subprocess
+import threading
+from typing import Callable, Optional
+
+from .startup import load_config
+from .speech_to_text import SAMPLE_RATE, AudioTooLong, ffmpeg_decode_args, is_too_long, pcm_to_float, np
+from .stt_pool import transcribe_audio
+from .audio_ingest import AUDIO_MAX_BYTES
+
+load_config()
+
+# Seconds of new audio between partial transcripts.
+VOICE_PARTIAL_EVERY_S = float(os.getenv("VOICE_PARTIAL_EVERY_S", "1.0"))
+# A partial transcribes only this much trailing audio, so each one costs the
+# same however long the utterance gets (the final pass covers all of it).
+VOICE_PARTIAL_WINDOW_S = float(os.getenv("VOICE_PARTIAL_WINDOW_S", "6"))
+# Server-side end of utterance: this much silence after speech (0 = client sends "end").
+VOICE_ENDPOINT_SILENCE_MS = int(os.getenv("VOICE_ENDPOINT_SILENCE_MS", "900"))
+# Frame RMS (0..1) above which a frame counts as speech.
+VOICE_SPEECH_RMS = float(os.getenv("VOICE_SPEECH_RMS", "0.02"))
+
+_FRAME = SAMPLE_RATE * 30 // 1000  # 30 ms
+_BYTES_PER_SAMPLE = 2
+
+
+class AudioTooLarge(Exception):
+    pass
+
+
+class Endpointer:
+    """Energy-based end-of-utterance: speech seen, then VOICE_ENDPOINT_SILENCE_MS of quiet."""
+
+    def __init__(self, silence_ms: int = VOICE_ENDPOINT_SILENCE_MS, threshold: float = VOICE_SPEECH_RMS):
+        self.silence_frames_needed = silence_ms // 30 if silence_ms > 0 else 0
+        self.threshold = threshold
+        self.speech_seen = False
+        self.silent_frames = 0
+        self._rest = b""  # tail shorter than one frame
+
+    def update(self, pcm: bytes) -> bool:
+        """Feed newly decoded s16le bytes; returns True once the utterance has ended."""
+        if not self.silence_frames_needed:
+            return False
+        buf = self._rest + pcm
+        frame_bytes = _FRAME * _BYTES_PER_SAMPLE
+        n = len(buf) // frame_bytes
+        self._rest = buf[n * frame_bytes:]
+        if n <= 0:
+            return self.ended
+        frames = pcm_to_float(buf[: n * frame_bytes]).reshape(n, _FRAME)
+        for loud in np.sqrt(np.mean(frames * frames, axis=1)) >= self.threshold:
+            if loud:
+                self.speech_seen = True
+                self.silent_frames = 0
+            elif self.speech_seen:
+                self.silent_frames += 1
+        return self.ended
+
+    @property
+    def ended(self) -> bool:
+        return self.speech_seen and self.silent_frames >= self.silence_frames_needed
+
+
+class StreamingDecoder:
+    """
+    One long-lived ffmpeg per utterance: encoded chunks (MediaRecorder webm/opus)
+    go to stdin as they arrive, PCM is collected from stdout on a reader thread,
+    so decoding overlaps the upload.
+    """
+
+    def __init__(self):
+        self._proc = subprocess.Popen(
+            ffmpeg_decode_args("pipe:0", streaming=True),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self._pcm = bytearray()
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, name="voice-decode", daemon=True)
+        self._reader.start()
+
+    def _read(self) -> None:
+        out = self._proc.stdout
+        for chunk in iter(lambda: out.read1(16384), b""):
+            with self._lock:
+                self._pcm += chunk
+
+    def feed(self, data: bytes) -> None:
+        try:
+            self._proc.stdin.write(data)
+            self._proc.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            # ffmpeg stopped (duration cap reached or bad input); keep what we have
+            pass
+
+    def pcm(self, start: int = 0) -> bytes:
+        """Decoded bytes from offset `start`, whole samples only."""
+        with self._lock:
+            end = len(self._pcm) - len(self._pcm) % _BYTES_PER_SAMPLE
+            return bytes(self._pcm[start:end])
+
+    def finish(self, timeout: float = 10.0) -> bytes:
+        try:
+            self._proc.stdin.close()
+        except (BrokenPipeError, ValueError):
+            pass
+        self._reader.join(timeout)
+        self.close()
+        return self.pcm()
+
+    def close(self) -> None:
+        if self._proc.poll() is None:
+            self._proc.kill()
+            self._proc.wait()
+
+
+class VoiceStream:
+    """
+    One streamed utterance.
+    feed(chunk) / poll() → True once the endpointer hears the end of the utterance.
+    Partial transcripts of the last VOICE_PARTIAL_WINDOW_S seconds run on a
+    background thread (one at a time, only on an idle STT worker) and are
+    handed to on_partial(text).
+    finish() returns the final transcript result.
+    """
+
+    def __init__(self, on_partial: Optional[Callable[[str], None]] = None):
+        self.decoder = StreamingDecoder()
+        self.endpointer = Endpointer()
+        self.on_partial = on_partial
+        self.bytes_in = 0
+        self._scored = 0  # decoded bytes already seen by the endpointer
+        self._last_partial_s = 0.0
+        self._partial_thread: Optional[threading.Thread] = None
+        self._last_partial_text = ""
+
+    def feed(self, chunk: bytes) -> bool:
+        self.bytes_in += len(chunk)
+        if self.bytes_in > AUDIO_MAX_BYTES:
+            raise AudioTooLarge()
+        self.decoder.feed(chunk)
+        return self.poll()
+
+    def poll(self) -> bool:
+        """Score audio decoded since the last call (decoding runs behind the upload)."""
+        new = self.decoder.pcm(self._scored)
+        self._scored += len(new)
+        if is_too_long(self._scored // _BYTES_PER_SAMPLE):
+            raise AudioTooLong()
+        ended = self.endpointer.update(new)
+        self._maybe_partial(self._scored / _BYTES_PER_SAMPLE / SAMPLE_RATE)
+        return ended
+
+    def _maybe_partial(self, seconds: float) -> None:
+        if self.on_partial is None or seconds - self._last_partial_s < VOICE_PARTIAL_EVERY_S:
+            return
+        if self._partial_thread is not None and self._partial_thread.is_alive():
+            return
+        self._last_partial_s = seconds
+        self._partial_thread = threading.Thread(target=self._run_partial, name="voice-partial", daemon=True)
+        self._partial_thread.start()
+
+    def _run_partial(self) -> None:
+        window = int(VOICE_PARTIAL_WINDOW_S * SAMPLE_RATE) * _BYTES_PER_SAMPLE
+        pcm = self.decoder.pcm(max(0, self._scored - window))
+        res = transcribe_audio(pcm, pcm=True, partial=True)
+        text = (res or {}).get("text") or ""
+        if text and text != self._last_partial_text:
+            self._last_partial_text = text
+            self.on_partial(text)
+
+    def finish(self):
+        """Final transcript of the whole utterance (raises SttBusy when saturated)."""
+        pcm = self.decoder.finish()
+        if self._partial_thread is not None:
+            self._partial_thread.join()
+        if not pcm:
+            return {"ok": False, "text": "", "summary": "no_audio"}
+        return transcribe_audio(pcm, pcm=True)
+
+    def close(self) -> None:
+        self.decoder.close()